@@ -0,0 +1,92 @@
+import os
+import json
+import base64
+import sqlite3
+
+DETECTIONS_DB_NAME = "detections.db"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(timestamp, uuid):
+    raw = json.dumps([timestamp, uuid], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, uuid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(timestamp), str(uuid)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor inválido: {cursor}") from e
+
+
+def _image_urls(base_dir, base_url, person_uuid):
+    images_dir_path = os.path.join(base_dir, person_uuid, 'images')
+    if not os.path.isdir(images_dir_path):
+        return []
+    return [
+        f"{base_url}/detections/{person_uuid}/images/{image_filename}"
+        for image_filename in os.listdir(images_dir_path)
+        if image_filename.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+def query_detections(base_dir, base_url, limit=DEFAULT_PAGE_SIZE, cursor=None,
+                     start=None, end=None, stream_code=None):
+    """
+    Consulta paginada del índice SQLite que escribe camera.service
+    (`<base_dir>/detections.db`), de la más reciente a la más antigua.
+
+    La paginación es por cursor (timestamp, uuid) sobre el índice, por lo que el
+    costo de cada página no depende del tamaño del historial. `start`/`end` son
+    timestamps epoch (segundos) y `stream_code` filtra por cámara.
+    Es bloqueante: llamarla desde un hilo (`asyncio.to_thread`).
+    """
+    db_path = os.path.join(base_dir, DETECTIONS_DB_NAME)
+    if not os.path.exists(db_path):
+        return {"detections": [], "next_cursor": None}
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    clauses, params = [], []
+    if stream_code:
+        clauses.append("stream_code = ?")
+        params.append(stream_code)
+    if start is not None:
+        clauses.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        clauses.append("timestamp < ?")
+        params.append(end)
+    if cursor:
+        cursor_timestamp, cursor_uuid = decode_cursor(cursor)
+        clauses.append("(timestamp < ? OR (timestamp = ? AND uuid < ?))")
+        params.extend([cursor_timestamp, cursor_timestamp, cursor_uuid])
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    sql = (
+        f"SELECT uuid, timestamp, data FROM detections {where} "
+        f"ORDER BY timestamp DESC, uuid DESC LIMIT ?"
+    )
+    params.append(limit + 1)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=5)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+    detections = []
+    for person_uuid, _, data in rows[:limit]:
+        person_data = json.loads(data)
+        person_data['image_urls'] = _image_urls(base_dir, base_url, person_uuid)
+        detections.append(person_data)
+
+    next_cursor = None
+    if len(rows) > limit:
+        last_uuid, last_timestamp, _ = rows[limit - 1]
+        next_cursor = encode_cursor(last_timestamp, last_uuid)
+
+    return {"detections": detections, "next_cursor": next_cursor}
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+
+class _StreamChannel:
+    """Último frame publicado de un stream y los eventos de sus suscriptores."""
+
+    def __init__(self):
+        self.frame = None
+        self.frame_time = 0.0
+        self.seq = 0
+        self.subscribers = set()
+        # Un evento por cada `watch_viewers()`: cada observador recibe su propio aviso
+        self.viewer_watchers = set()
+
+
+class FrameHub:
+    """
+    Difusión de frames por stream: un slot con el último frame y N suscriptores.
+
+    `publish()` solo reemplaza el frame del slot y despierta a los suscriptores,
+    por lo que el POST de camera.service nunca espera a ningún navegador. Cada
+    suscriptor (`frames()`) envía a su ritmo y, si es lento, salta directamente al
+    frame más reciente; un cliente lento no afecta a los demás.
+
+    `watch_viewers()` permite avisar a camera.service cuántos espectadores hay,
+    para que solo codifique frames de vista previa mientras alguien mira.
+
+    Un nuevo espectador recibe de inmediato el último frame solo si tiene menos de
+    `MAX_INITIAL_FRAME_AGE_SECONDS`; si no, espera al siguiente.
+    """
+
+    MAX_INITIAL_FRAME_AGE_SECONDS = 5.0
+
+    def __init__(self):
+        self._channels = {}
+
+    def _channel(self, stream_id):
+        channel = self._channels.get(stream_id)
+        if channel is None:
+            channel = self._channels[stream_id] = _StreamChannel()
+        return channel
+
+    def publish(self, stream_id, frame):
+        channel = self._channel(stream_id)
+        channel.frame = frame
+        channel.frame_time = time.monotonic()
+        channel.seq += 1
+        for event in channel.subscribers:
+            event.set()
+        return len(channel.subscribers)
+
+    def viewers(self, stream_id):
+        channel = self._channels.get(stream_id)
+        return len(channel.subscribers) if channel else 0
+
+    async def watch_viewers(self, stream_id):
+        """Generador asíncrono con la cantidad de espectadores: la actual y luego cada cambio."""
+        channel = self._channel(stream_id)
+        changed = asyncio.Event()
+        channel.viewer_watchers.add(changed)
+        last_count = None
+        try:
+            while True:
+                changed.clear()
+                count = len(channel.subscribers)
+                if count != last_count:
+                    last_count = count
+                    yield count
+                await changed.wait()
+        finally:
+            channel.viewer_watchers.discard(changed)
+
+    def _set_subscribed(self, channel, event, subscribed):
+        if subscribed:
+            channel.subscribers.add(event)
+        else:
+            channel.subscribers.discard(event)
+        for changed in channel.viewer_watchers:
+            changed.set()
+
+    async def frames(self, stream_id):
+        """Generador asíncrono con el frame más reciente cada vez que hay uno nuevo."""
+        channel = self._channel(stream_id)
+        event = asyncio.Event()
+        self._set_subscribed(channel, event, True)
+        last_seq = 0
+        try:
+            if channel.frame is not None and \
+                    time.monotonic() - channel.frame_time <= self.MAX_INITIAL_FRAME_AGE_SECONDS:
+                # El nuevo espectador recibe de inmediato el último frame, si es reciente
+                event.set()
+            while True:
+                await event.wait()
+                event.clear()
+                if channel.seq == last_seq:
+                    continue
+                last_seq = channel.seq
+                yield channel.frame
+        finally:
+            self._set_subscribed(channel, event, False)
@@ -1,19 +1,21 @@
-from fastapi import FastAPI, Request, Response, WebSocket, HTTPException
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.websockets import WebSocketState
 from sse_starlette.sse import EventSourceResponse
 from collections import deque
+from typing import Optional
 import uvicorn, logging, asyncio, json, cv2, io, os
 from src.status import get_system_status, restart_service
 from src.config import get_config_from_json, update_config, check_cnn_url
 from src.settings import update_settings
 from src.settings_streams import update_stream_settings
+from src.detections import query_detections, DEFAULT_PAGE_SIZE
+from src.frame_hub import FrameHub
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
-active_websockets = {}
+frame_hub = FrameHub()
 app = FastAPI()
 
 # Habilitar CORS para permitir solicitudes desde localhost:4200
@@ -26,7 +28,8 @@ app.add_middleware(
 )
 
 FILE_PATH = '/var/lib/vhs'
-DETECTIONS_BASE_DIR = "/opt/vhs/storage/detections"
+# Directorio compartido con camera.service y sync.service (config.json: base_storage_dir)
+DETECTIONS_BASE_DIR = get_config_from_json().get("base_storage_dir", "/opt/vhs/storage/detections")
 
 # @app.get("/thumbnail/{stream_id}")
 # async def get_thumbnail(stream_id: str):
@@ -76,28 +79,64 @@ async def set_config(request: Request, stream_id: str):
 
 @app.post("/processed_stream/{stream_id}")
 async def receive_processed_frame(stream_id: str, request: Request):
-    websocket = active_websockets.get(stream_id)
-    if websocket and websocket.client_state == WebSocketState.CONNECTED:
-        try:
-            image_bytes = await request.body()
-            await websocket.send_bytes(image_bytes)
-            return {"status": "frame sent"}
-        except Exception as e:
-            print(f"Error sending to websocket for {stream_id}: {e}")
-            return {"status": "websocket send error"}
+    image_bytes = await request.body()
+    viewers = frame_hub.publish(stream_id, image_bytes)
+    if viewers:
+        return {"status": "frame published", "viewers": viewers}
     return {"status": "no active websocket for this stream"}
 
+@app.websocket("/ingest/{stream_id}")
+async def ingest_endpoint(websocket: WebSocket, stream_id: str):
+    """
+    Canal persistente desde camera.service: cada mensaje binario es un frame JPEG.
+    En sentido inverso se envía `{"viewers": n}` cada vez que cambia la cantidad de
+    espectadores, para que la cámara solo codifique mientras alguien mira.
+    """
+    await websocket.accept()
+
+    async def receive_frames():
+        while True:
+            frame_hub.publish(stream_id, await websocket.receive_bytes())
+
+    async def send_viewers():
+        async for count in frame_hub.watch_viewers(stream_id):
+            await websocket.send_json({"viewers": count})
+
+    tasks = [asyncio.create_task(receive_frames()), asyncio.create_task(send_viewers())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if isinstance(error, WebSocketDisconnect):
+                print(f"Ingest desconectado: {stream_id}")
+            elif error is not None:
+                print(f"Ingest error ({stream_id}): {error}")
+    finally:
+        for task in tasks:
+            task.cancel()
+
 @app.websocket("/ws/{stream_id}")
 async def websocket_endpoint(websocket: WebSocket, stream_id: str):
     await websocket.accept()
-    active_websockets[stream_id] = websocket
-    try:
+
+    async def send_frames():
+        async for frame in frame_hub.frames(stream_id):
+            await websocket.send_bytes(frame)
+
+    async def wait_disconnect():
         while True:
             await websocket.receive_text()  # o mantener el socket abierto
-    except Exception as e:
-        print(f"WebSocket error: {e}")
+
+    # Cada espectador tiene su propio envío: si se atrasa, salta al último frame
+    tasks = [asyncio.create_task(send_frames()), asyncio.create_task(wait_disconnect())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                print(f"WebSocket error: {task.exception()}")
     finally:
-        del active_websockets[stream_id]
+        for task in tasks:
+            task.cancel()
      
 BUFFER_SIZE = 1
 events_buffer = {} # Almacenamos los buffers por stream_id     
@@ -148,65 +187,37 @@ async def get_events(stream_id: str):
   
   
 @app.get("/detections")
-async def list_detections(request: Request): # Añadimos 'request' para obtener la URL base
-    """
-    Lista todas las detecciones de personas guardadas en la estructura UUID/data.json.
-    Retorna un array de objetos JSON, donde cada objeto contiene los datos de una persona detectada.
-    Incluye URLs para las imágenes de los ROIs.
+async def list_detections(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    stream_code: Optional[str] = None,
+):
     """
-    detections = []
-    if not os.path.exists(DETECTIONS_BASE_DIR):
-        logger.warning(f"Directorio de detecciones no encontrado: {DETECTIONS_BASE_DIR}")
-        return {"detections": []}
+    Lista las detecciones de personas desde el índice local (SQLite), de la más
+    reciente a la más antigua, con paginación por cursor.
 
-    try:
-        # Obtener la URL base de la aplicación para construir los enlaces de las imágenes
-        # Esto considera si estás usando un proxy inverso o un puerto específico
-        base_url = str(request.base_url).rstrip('/')
-
-        # Recorrer cada directorio que representa un UUID de persona
-        for person_uuid_dir in os.listdir(DETECTIONS_BASE_DIR):
-            person_dir_path = os.path.join(DETECTIONS_BASE_DIR, person_uuid_dir)
-
-            # Asegurarse de que sea un directorio válido (un UUID)
-            if os.path.isdir(person_dir_path):
-                data_json_path = os.path.join(person_dir_path, 'data.json')
-                images_dir_path = os.path.join(person_dir_path, 'images')
-
-                if os.path.exists(data_json_path):
-                    try:
-                        with open(data_json_path, 'r') as f:
-                            person_data = json.load(f)
-
-                            # Añadir un nodo 'image_urls' con los enlaces a las imágenes
-                            image_urls = []
-                            if os.path.exists(images_dir_path) and os.path.isdir(images_dir_path):
-                                for image_filename in os.listdir(images_dir_path):
-                                    # Filtrar solo archivos de imagen si es necesario (ej. .jpg, .png)
-                                    if image_filename.lower().endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp')):
-                                        # Construir la URL completa para cada imagen
-                                        # Ej: http://localhost:8000/detections/UUID/images/roi_timestamp.jpg
-                                        image_url = f"{base_url}/detections/{person_uuid_dir}/images/{image_filename}"
-                                        image_urls.append(image_url)
-                            
-                            # Opcional: Podrías ordenar las imágenes por timestamp si el nombre del archivo lo permite
-                            # image_urls.sort() 
-
-                            person_data['image_urls'] = image_urls
-                            detections.append(person_data)
-
-                    except json.JSONDecodeError as e:
-                        logger.error(f"Error decodificando JSON en {data_json_path}: {e}")
-                    except Exception as e:
-                        logger.error(f"Error leyendo o procesando {data_json_path}: {e}")
-                else:
-                    logger.warning(f"No se encontró data.json en el directorio: {person_dir_path}")
+    - `limit`: tamaño de página (máx. 500).
+    - `cursor`: valor `next_cursor` de la página anterior.
+    - `start` / `end`: rango de tiempo (epoch, segundos).
+    - `stream_code`: filtra por cámara.
 
+    Cada detección incluye `image_urls` con los enlaces a sus imágenes, si existen.
+    """
+    base_url = str(request.base_url).rstrip('/')
+    try:
+        # La consulta y el acceso a disco se hacen fuera del event loop
+        return await asyncio.to_thread(
+            query_detections, DETECTIONS_BASE_DIR, base_url,
+            limit=limit, cursor=cursor, start=start, end=end, stream_code=stream_code,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        logger.error(f"Error al listar detecciones en {DETECTIONS_BASE_DIR}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error al procesar el directorio de detecciones: {e}")
-
-    return {"detections": detections}
+        logger.error(f"Error al consultar detecciones en {DETECTIONS_BASE_DIR}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error al consultar las detecciones: {e}")
 
 
 @app.get("/detections/{person_uuid}/images/{image_filename}")
@@ -72,17 +72,37 @@ if __name__ == "__main__":
             frame_count = 0
             frame_skip  = 1  
 
-            for frame in video_source(stream, fps=30.0):
-
-                # --- Grabar frame sin procesar ---
-                current_time = time.time()
-                # Procesamiento posterior (ROI, etc.)
-                roi_frame = vhs_utils.crop_and_resize_roi_padded(frame, stream_config.get('roi', None), target_size=(640, 640))
-                processed_frame, _ = frame_processor.execute(roi_frame)
+            roi = stream_config.get('roi', None)
+
+            # Plan de recorte/letterbox precalculado; se reconstruye si cambia la resolución.
+            # Con PIPELINED_INFERENCE hay varios frames en vuelo: cada uno toma un buffer del
+            # pool, que se devuelve una vez mostrado el frame procesado.
+            in_flight = []
+
+            def roi_frames():
+                plan = None
+                for frame in video_source(stream, fps=30.0):
+                    if plan is None or not plan.matches(frame):
+                        plan = vhs_utils.LetterboxPlan(frame.shape, roi, target_size=(640, 640), pool_size=4)
+                    buffer = plan.acquire()
+                    in_flight.append((plan, buffer))
+                    yield plan.apply(frame, out=buffer)
+
+            # Por defecto la inferencia va en pipeline con el post-procesamiento;
+            # PIPELINED_INFERENCE=0 vuelve al modo síncrono frame a frame.
+            if os.getenv("PIPELINED_INFERENCE", "1") == "1":
+                processed_frames = frame_processor.execute_stream(roi_frames())
+            else:
+                processed_frames = (frame_processor.execute(roi_frame) for roi_frame in roi_frames())
+
+            for processed_frame, _ in processed_frames:
 
                 # Mostrar en pantalla
                 cv2.imshow("RTSP Stream", processed_frame)
                 frame_count += 1
+                # Los resultados llegan en orden: el más antiguo en vuelo es el que se acaba de mostrar
+                frame_plan, buffer = in_flight.pop(0)
+                frame_plan.release(buffer)
 
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     print("Tecla 'q' presionada. Saliendo...")
@@ -4,29 +4,14 @@ from src.ModelLoader import ModelLoader
 from typing import Tuple, Dict, Any
 
 
-def check_line_crossing(point: Tuple[float, float], line_start: Tuple[int, int], line_end: Tuple[int, int]) -> bool:
-    x, y = point
-    x1, y1 = line_start
-    x2, y2 = line_end
-    position = (y2 - y1) * x + (x1 - x2) * y + (x2 * y1 - x1 * y2)
-    return position > 0
-
-def get_bbox_anchor_point(bbox: Tuple[int, int, int, int], anchor_type: degirum_tools.AnchorPoint) -> Tuple[float, float]:
-    x1, y1, x2, y2 = bbox
-    if anchor_type == degirum_tools.AnchorPoint.CENTER:
-        return ((x1 + x2) / 2, (y1 + y2) / 2)
-    elif anchor_type == degirum_tools.AnchorPoint.BOTTOM_CENTER:
-        return ((x1 + x2) / 2, y2)
-    elif anchor_type == degirum_tools.AnchorPoint.TOP_CENTER:
-        return ((x1 + x2) / 2, y1)
-    elif anchor_type == degirum_tools.AnchorPoint.BOTTOM_LEFT:
-        return (x1, y2)
-    elif anchor_type == degirum_tools.AnchorPoint.BOTTOM_RIGHT:
-        return (x2, y2)
-    return ((x1 + x2) / 2, (y1 + y2) / 2)
-
 # --- Clase CustomLineCounter ---
 class CustomLineCounter:
+    """
+    Línea de conteo configurada: geometría, sentido, filtro de clases, conteos y
+    callbacks. La detección de cruces la hace `LineCrossingEngine` para todas las
+    líneas del stream a la vez; aquí solo se registran los cruces y se anota el frame.
+    """
+
     def __init__(
         self,
         line: Tuple[int, int, int, int],
@@ -57,126 +42,50 @@ class CustomLineCounter:
         self.class_list = class_list
         self.entry_count = 0
         self.exit_count = 0
-        self._last_side: Dict[int, bool] = {}
-        self._counted_trails: Dict[int, bool] = {}
         self.anchor_point = anchor_point
         self.on_cross_callbacks = on_cross_callbacks or []
         
 
-    def _intersect_segments(self, p1: Tuple[float, float], q1: Tuple[float, float], p2: Tuple[float, float], q2: Tuple[float, float]) -> bool:
-        def orientation(p, q, r):
-            val = (q[1] - p[1]) * (r[0] - q[0]) - \
-                  (q[0] - p[0]) * (r[1] - q[1])
-            if val == 0: return 0
-            return 1 if val > 0 else 2
-
-        def on_segment(p, q, r):
-            return (q[0] <= max(p[0], r[0]) and q[0] >= min(p[0], r[0]) and
-                    q[1] <= max(p[1], r[1]) and q[1] >= min(p[1], r[1]))
-
-        o1 = orientation(p1, q1, p2)
-        o2 = orientation(p1, q1, q2)
-        o3 = orientation(p2, q2, p1)
-        o4 = orientation(p2, q2, q1)
-
-        if o1 != 0 and o2 != 0 and o3 != 0 and o4 != 0 and o1 != o2 and o3 != o4:
-            return True
-
-        if o1 == 0 and on_segment(p1, p2, q1): return True
-        if o2 == 0 and on_segment(p1, q2, q1): return True
-        if o3 == 0 and on_segment(p2, p1, q2): return True
-        if o4 == 0 and on_segment(p2, q1, q2): return True
-
-        return False
-
-    def analyze(self, result: Any):
-        if not hasattr(result, "trails") or not result.trails:
-            self._last_side = {}
-            self._counted_trails = {}
-            return
-
-        # Construir diccionario: track_id -> class_name
-        tid_to_class = {}
-        if hasattr(result, "results"):
-            for det in result.results:
-                tid = det.get("track_id")
-                class_name = det.get("class_name") or det.get("label") or det.get("class")
-                if tid is not None and class_name is not None:
-                    tid_to_class[tid] = class_name
-
-        line_p1 = tuple(self.line[:2])
-        line_p2 = tuple(self.line[2:])
-
-        for tid, trail_bboxes in result.trails.items():
-            # 🔍 Filtro por clase
-            if self.class_list:
-                class_name = tid_to_class.get(tid)
-                if class_name not in self.class_list:
-                    continue
-
-            if not trail_bboxes or len(trail_bboxes) < 2:
-                if trail_bboxes and tid not in self._last_side:
-                    current_bbox = trail_bboxes[-1]
-                    current_point = get_bbox_anchor_point(current_bbox, self.anchor_point)
-                    self._last_side[tid] = check_line_crossing(current_point, line_p1, line_p2)
-                continue
-
-            current_bbox = trail_bboxes[-1]
-            last_bbox = trail_bboxes[-2]
-
-            current_point = get_bbox_anchor_point(current_bbox, self.anchor_point)
-            last_point = get_bbox_anchor_point(last_bbox, self.anchor_point)
-
-            current_side = check_line_crossing(current_point, line_p1, line_p2)
-
-            if tid not in self._last_side:
-                self._last_side[tid] = current_side
-                continue
-
-            segments_intersect = self._intersect_segments(line_p1, line_p2, last_point, current_point)
-
-            if (
-                self._last_side[tid] != current_side
-                and not self._counted_trails.get(tid, False)
-                and segments_intersect
-            ):
-                sentido = (self._last_side[tid], current_side)
-                direction = 'Unknown';
-                
-                if self.count_direction == "HORIZONTAL":
-                    if sentido == (False, True):
-                        direction = "Right"
-                        self.entry_count += 1
-                    elif sentido == (True, False):
-                        direction = "Left"
-                        self.exit_count += 1
-                elif self.count_direction == "VERTICAL":
-                    if sentido == (False, True):
-                        direction = "Down"
-                        self.entry_count += 1
-                    elif sentido == (True, False):
-                        direction = "Up"
-                        self.exit_count += 1
-                else:
-                    self.entry_count += 1
-                
-                event = {
-                    "tid": tid,
-                    "uuid": str(uuid.uuid4()),
-                    "name": self.name,
-                    "type": "person_crossed_line",
-                    "direction": direction,
-                    "class_name": tid_to_class.get(tid, "Unknown"),
-                    "timestamp": time.time(),
-                }
-                
-                for callback in self.on_cross_callbacks:
-                    callback(event)
-
-                print(f"🟢 {self.name} TID {tid} CRUCE DETECTADO! Entrada: {self.entry_count}, Salida: {self.exit_count}")
-                self._counted_trails[tid] = True if self.count_first_crossing else False
+    def register_crossing(self, tid: int, last_side: bool, current_side: bool, class_name: str) -> Dict[str, Any]:
+        """
+        Registra un cruce confirmado: actualiza los conteos según el sentido, arma el
+        evento y ejecuta los callbacks. Lo llama LineCrossingEngine.
+        """
+        sentido = (last_side, current_side)
+        direction = 'Unknown'
+        
+        if self.count_direction == "HORIZONTAL":
+            if sentido == (False, True):
+                direction = "Right"
+                self.entry_count += 1
+            elif sentido == (True, False):
+                direction = "Left"
+                self.exit_count += 1
+        elif self.count_direction == "VERTICAL":
+            if sentido == (False, True):
+                direction = "Down"
+                self.entry_count += 1
+            elif sentido == (True, False):
+                direction = "Up"
+                self.exit_count += 1
+        else:
+            self.entry_count += 1
+        
+        event = {
+            "tid": tid,
+            "uuid": str(uuid.uuid4()),
+            "name": self.name,
+            "type": "person_crossed_line",
+            "direction": direction,
+            "class_name": class_name,
+            "timestamp": time.time(),
+        }
+        
+        for callback in self.on_cross_callbacks:
+            callback(event)
 
-            self._last_side[tid] = current_side
+        print(f"🟢 {self.name} TID {tid} CRUCE DETECTADO! Entrada: {self.entry_count}, Salida: {self.exit_count}")
+        return event
 
     def annotate(self, frame: np.ndarray) -> np.ndarray:
         """
@@ -0,0 +1,121 @@
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+FACE_LABEL = "human face"
+NO_TRACK = -1
+
+
+class DetectionBatch:
+    """
+    Vista en arrays NumPy de `result.results` para un frame.
+
+    Se construye una sola vez por frame (`DetectionBatch.of(result)`, que la guarda
+    en el propio resultado) y la comparten FrameProcessor, EventProcessor,
+    LineCrossingEngine y PersonRecognitionManager, en lugar de que cada uno vuelva a
+    recorrer la lista de dicts comparando etiquetas en minúsculas.
+
+    - `bboxes` (N, 4) float32, `scores` (N,), `track_ids` (N,) con -1 si no hay track.
+    - `class_ids` (N,) indexa `labels` (etiquetas en minúsculas, en orden de aparición).
+    - `mask(label)` / `indices(label)` se calculan una vez por etiqueta y se cachean.
+    - `results[i]` sigue siendo el dict original de la detección `i`.
+    """
+
+    _RESULT_ATTR = "_vhs_detection_batch"
+
+    def __init__(self, results: Iterable[Dict[str, Any]]):
+        self.results: List[Dict[str, Any]] = [
+            r for r in results if isinstance(r, dict) and r.get('bbox') is not None and 'label' in r
+        ]
+        count = len(self.results)
+
+        self.bboxes = np.array([r['bbox'] for r in self.results], dtype=np.float32).reshape(count, 4)
+        self.scores = np.array([r.get('score', 0.0) or 0.0 for r in self.results], dtype=np.float32)
+        self.track_ids = np.array(
+            [r['track_id'] if isinstance(r.get('track_id'), int) else NO_TRACK for r in self.results],
+            dtype=np.int64,
+        )
+
+        self.labels: List[str] = []
+        label_index: Dict[str, int] = {}
+        class_ids = np.empty(count, dtype=np.int32)
+        for i, r in enumerate(self.results):
+            label = (r.get('label') or '').lower()
+            class_id = label_index.get(label)
+            if class_id is None:
+                class_id = label_index[label] = len(self.labels)
+                self.labels.append(label)
+            class_ids[i] = class_id
+        self.class_ids = class_ids
+        self._label_index = label_index
+
+        self._masks: Dict[str, np.ndarray] = {}
+        self._track_classes: Optional[Dict[int, str]] = None
+
+    @classmethod
+    def of(cls, result: Any) -> "DetectionBatch":
+        """Batch del resultado, construido en la primera llamada y reutilizado después."""
+        batch = getattr(result, cls._RESULT_ATTR, None)
+        if batch is None:
+            batch = cls.attach(result)
+        return batch
+
+    @classmethod
+    def attach(cls, result: Any) -> "DetectionBatch":
+        """(Re)construye el batch y lo guarda en el resultado; usar tras modificar `result.results`."""
+        batch = cls(getattr(result, 'results', None) or [])
+        try:
+            setattr(result, cls._RESULT_ATTR, batch)
+        except AttributeError:
+            pass
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def mask(self, label: str) -> np.ndarray:
+        label = label.lower()
+        mask = self._masks.get(label)
+        if mask is None:
+            class_id = self._label_index.get(label)
+            mask = self.class_ids == class_id if class_id is not None else np.zeros(len(self), dtype=bool)
+            self._masks[label] = mask
+        return mask
+
+    def mask_any(self, labels: Iterable[str]) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        for label in labels:
+            mask |= self.mask(label)
+        return mask
+
+    def indices(self, label: str) -> np.ndarray:
+        return np.flatnonzero(self.mask(label))
+
+    @property
+    def tracked(self) -> np.ndarray:
+        return self.track_ids != NO_TRACK
+
+    def faces(self, min_score: float = 0.0) -> np.ndarray:
+        """Índices de los rostros con score >= `min_score`."""
+        return np.flatnonzero(self.mask(FACE_LABEL) & (self.scores >= min_score))
+
+    def track_id_set(self) -> Set[int]:
+        return set(self.track_ids[self.tracked].tolist())
+
+    def track_classes(self) -> Dict[int, str]:
+        """track_id → nombre de clase tal como lo reporta el modelo (`class_name` o `label`)."""
+        if self._track_classes is None:
+            self._track_classes = {}
+            for i in np.flatnonzero(self.tracked):
+                det = self.results[i]
+                class_name = det.get("class_name") or det.get("label") or det.get("class")
+                if class_name is not None:
+                    self._track_classes[int(self.track_ids[i])] = class_name
+        return self._track_classes
+
+    def centers(self, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        boxes = self.bboxes if indices is None else self.bboxes[indices]
+        return np.stack(((boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2), axis=1)
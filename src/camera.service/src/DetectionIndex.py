@@ -0,0 +1,85 @@
+import os
+import json
+import sqlite3
+from typing import Any, Dict, Iterable
+
+DETECTIONS_DB_NAME = "detections.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    uuid        TEXT PRIMARY KEY,
+    timestamp   REAL,
+    stream_code TEXT,
+    place_code  TEXT,
+    direction   TEXT,
+    gender      TEXT,
+    age         REAL,
+    data        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp DESC, uuid DESC);
+CREATE INDEX IF NOT EXISTS idx_detections_stream_timestamp ON detections (stream_code, timestamp DESC, uuid DESC);
+"""
+
+
+class DetectionIndex:
+    """
+    Índice local (SQLite, modo WAL) de las detecciones para las consultas del BFF.
+
+    `<base_storage_dir>/detections.db` guarda cada `DetectionRecord` con columnas
+    indexadas por fecha, stream y uuid. Lo escribe únicamente el hilo de
+    `DetectionWriter`, una transacción por lote; el BFF lo abre en solo lectura y
+    en modo WAL las lecturas no bloquean a las escrituras.
+    """
+
+    BUSY_TIMEOUT_MS = 5000
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, DETECTIONS_DB_NAME)
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            # Se abre de forma diferida: la conexión pertenece al hilo de DetectionWriter
+            conn = sqlite3.connect(self.path, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def add(self, records: Iterable[Dict[str, Any]]):
+        rows = [
+            (
+                record.get('uuid'),
+                record.get('timestamp'),
+                record.get('stream_code'),
+                record.get('place_code'),
+                record.get('direction'),
+                record.get('gender'),
+                record.get('age'),
+                json.dumps(record, separators=(',', ':'), default=_to_builtin),
+            )
+            for record in records if record.get('uuid')
+        ]
+        if not rows:
+            return
+
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO detections "
+                "(uuid, timestamp, stream_code, place_code, direction, gender, age, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _to_builtin(value: Any):
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Tipo no serializable en DetectionIndex: {type(value)}")
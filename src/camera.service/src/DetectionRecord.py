@@ -0,0 +1,107 @@
+import statistics
+from typing import Any, Dict, List, Optional
+import msgpack
+
+GENDER_LABELS = ("Female", "Male")
+AGE_LABEL = "Age"
+
+
+class DetectionRecord:
+    """
+    Registro final y compacto de una persona detectada (esquema `SCHEMA_VERSION`).
+
+    Es el documento que se guarda en el log de eventos y que sync.service sube a
+    Mongo. En lugar del estado interno del tracker (`inference_in_progress`,
+    `last_inference_time`, ...) y de la lista de `features` crudas, conserva solo
+    el resultado agregado:
+
+    - `gender` / `gender_confidence`: voto de las inferencias por su etiqueta más
+      probable; la confianza es el score medio del ganador ponderado por el
+      porcentaje de inferencias que coinciden.
+    - `age`: mediana de las edades estimadas.
+    - `raw_features`: solo si se pide (`store_raw_features` en config.json).
+
+    Los campos del evento de cruce conservan sus nombres (`name`, `type`, ...), los
+    mismos de los documentos ya existentes en Mongo y de los archivos anteriores.
+
+    `encode()` serializa con msgpack.
+    """
+
+    SCHEMA_VERSION = 1
+
+    @classmethod
+    def build(cls, event: Dict[str, Any], include_raw_features: bool = False) -> Dict[str, Any]:
+        features = event.get('features') or []
+        gender, gender_confidence = cls._aggregate_gender(features)
+
+        record = {
+            "schema": cls.SCHEMA_VERSION,
+            "uuid": event.get('uuid'),
+            "tid": event.get('tid'),
+            "place_code": event.get('place_code'),
+            "stream_code": event.get('stream_code'),
+            "name": event.get('name'),
+            "type": event.get('type'),
+            "direction": event.get('direction'),
+            "class_name": event.get('class_name'),
+            "timestamp": event.get('timestamp'),
+            "start_time": event.get('start_time'),
+            "gender": gender,
+            "gender_confidence": gender_confidence,
+            "age": cls._aggregate_age(features),
+            "inferences": len(features),
+            "inference_failures": event.get('inference_failures', 0),
+        }
+        if include_raw_features:
+            record["raw_features"] = features
+        return record
+
+    @staticmethod
+    def _predictions(features: List[Any]) -> List[List[Dict[str, Any]]]:
+        """Normaliza cada inferencia a una lista de dicts `{label, score}`."""
+        predictions = []
+        for inference in features:
+            if isinstance(inference, dict):
+                inference = [inference]
+            if isinstance(inference, list):
+                predictions.append([p for p in inference if isinstance(p, dict) and 'label' in p])
+        return predictions
+
+    @classmethod
+    def _aggregate_gender(cls, features: List[Any]):
+        votes: Dict[str, List[float]] = {}
+        predictions = cls._predictions(features)
+        for inference in predictions:
+            candidates = [p for p in inference if p.get('label') in GENDER_LABELS]
+            if not candidates:
+                continue
+            best = max(candidates, key=lambda p: float(p.get('score', 0.0)))
+            votes.setdefault(best['label'], []).append(float(best.get('score', 0.0)))
+
+        if not votes:
+            return None, None
+
+        label, scores = max(votes.items(), key=lambda item: (len(item[1]), sum(item[1])))
+        agreement = len(scores) / sum(len(s) for s in votes.values())
+        return label, round(statistics.fmean(scores) * agreement, 3)
+
+    @classmethod
+    def _aggregate_age(cls, features: List[Any]) -> Optional[float]:
+        ages = [
+            float(p.get('score'))
+            for inference in cls._predictions(features)
+            for p in inference
+            if p.get('label') == AGE_LABEL and p.get('score') is not None
+        ]
+        return round(statistics.median(ages), 1) if ages else None
+
+    @staticmethod
+    def encode(record: Dict[str, Any]) -> bytes:
+        return msgpack.packb(record, use_bin_type=True, default=_to_builtin)
+
+
+def _to_builtin(value: Any):
+    # Escalares y arrays de numpy que puedan venir en los resultados de inferencia
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Tipo no serializable en DetectionRecord: {type(value)}")
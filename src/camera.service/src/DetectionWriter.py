@@ -0,0 +1,152 @@
+import atexit
+import queue
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.DetectionIndex import DetectionIndex
+from src.EventLog import EventLog
+from src.StageLatency import StageLatency
+
+DEFAULT_DETECTIONS_DIR = "/opt/vhs/storage/detections"
+
+
+class DetectionWriter:
+    """
+    Persistencia en segundo plano de las detecciones de personas.
+
+    `submit()` solo encola el documento ya serializado (`DetectionRecord`), por lo que
+    se puede invocar con el lock del tracker tomado sin bloquear el bucle de frames.
+    Un hilo dedicado agrupa los eventos pendientes y los añade al `EventLog` del
+    stream con una sola escritura secuencial y un solo fsync por lote; luego los
+    registra en el `DetectionIndex` (SQLite) que consulta el BFF.
+
+    Encolar no significa guardar: cada documento puede llevar un `on_done(ok)` que
+    se invoca desde el hilo escritor cuando el lote ya está en disco (fsync) o
+    cuando se agotaron los reintentos. Un lote que falla se reintenta con espera
+    exponencial antes de reportarse como fallido.
+    """
+
+    MAX_BATCH = 32
+    BATCH_WINDOW_SECONDS = 0.5
+    STOP_TIMEOUT_SECONDS = 5.0
+    MAX_WRITE_ATTEMPTS = 4
+    RETRY_BACKOFF_SECONDS = 0.5
+
+    def __init__(self, directory: str = DEFAULT_DETECTIONS_DIR, writer_id: str = "default"):
+        self.directory = directory
+        self.event_log = EventLog(directory, writer_id)
+        self.index = DetectionIndex(directory)
+
+        self._queue: "queue.Queue[Tuple[bytes, Dict[str, Any], Optional[Callable[[bool], None]]]]" = queue.Queue()
+        self._stop = threading.Event()
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.latency = StageLatency()
+
+        self._thread = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+        self._thread.start()
+        # Vaciar la cola al terminar el proceso de forma ordenada
+        atexit.register(self.stop)
+
+    def submit(self, payload: bytes, record: Dict[str, Any], on_done: Optional[Callable[[bool], None]] = None):
+        """
+        Encola un documento ya serializado (un registro del log) junto con su
+        `DetectionRecord`. `on_done(True)` confirma que ya es durable en el log.
+        """
+        self._queue.put((payload, record, on_done))
+
+    def _next_batch(self) -> List[Tuple[bytes, Dict[str, Any], Optional[Callable[[bool], None]]]]:
+        try:
+            first = self._queue.get(timeout=self.BATCH_WINDOW_SECONDS)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        while len(batch) < self.MAX_BATCH:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write_batch(batch)
+        # La conexión SQLite pertenece a este hilo
+        self.index.close()
+
+    def _append_with_retry(self, batch) -> bool:
+        """Añade el lote al log reintentando con espera exponencial. Retorna True si quedó en disco."""
+        delay = self.RETRY_BACKOFF_SECONDS
+        for attempt in range(1, self.MAX_WRITE_ATTEMPTS + 1):
+            try:
+                self.event_log.append(payload for payload, _, _ in batch)
+                return True
+            except Exception:
+                print(f"[❌_SAVE_JSON] Error al añadir {len(batch)} detecciones al log {self.event_log.current_segment} "
+                      f"(intento {attempt}/{self.MAX_WRITE_ATTEMPTS}).")
+                traceback.print_exc()
+                # Un registro pudo quedar a medias: el reintento va a un segmento nuevo
+                try:
+                    self.event_log.close()
+                except Exception:
+                    pass
+            if attempt < self.MAX_WRITE_ATTEMPTS:
+                self.retries += 1
+                time.sleep(delay)
+                delay *= 2
+        return False
+
+    @staticmethod
+    def _notify(batch, ok: bool):
+        for _, _, on_done in batch:
+            if on_done is None:
+                continue
+            try:
+                on_done(ok)
+            except Exception:
+                traceback.print_exc()
+
+    def _write_batch(self, batch: List[Tuple[bytes, Dict[str, Any], Optional[Callable[[bool], None]]]]):
+        started_at = time.perf_counter()
+        if not self._append_with_retry(batch):
+            self.failed += len(batch)
+            # Los dueños de los eventos los conservan y volverán a enviarlos
+            self._notify(batch, False)
+            return
+        self.written += len(batch)
+        self._notify(batch, True)
+
+        try:
+            self.index.add(record for _, record, _ in batch)
+        except Exception:
+            # El log es la fuente de verdad; el índice solo afecta a las consultas del BFF
+            print(f"[⚠️] Error al indexar {len(batch)} detecciones en {self.index.path}.")
+            traceback.print_exc()
+
+        self.batches += 1
+        self.latency.add("write_batch", time.perf_counter() - started_at)
+        print(f"[✔_SAVE_JSON] Lote de {len(batch)} detecciones añadido a {self.event_log.current_segment}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+            "latency": self.latency.report(),
+        }
+
+    def stop(self):
+        """Escribe lo pendiente y detiene el hilo."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join(self.STOP_TIMEOUT_SECONDS)
+        self.event_log.shutdown()
@@ -0,0 +1,118 @@
+import os
+import re
+import socket
+import struct
+import time
+import zlib
+from typing import Iterable, Optional
+
+EVENT_LOG_SUBDIR = "log"
+# Socket datagrama (Unix) donde sync.service escucha avisos de registros nuevos
+NOTIFY_SOCKET_NAME = ".sync.sock"
+# Segmentos `.mpk`: registros con prefijo de longitud
+_SEGMENT_RE = re.compile(r"^(?P<writer>.+)-(?P<index>\d{8})\.mpk$")
+SEGMENT_EXTENSION = "mpk"
+# Cabecera de cada registro: longitud del cuerpo y CRC32 del cuerpo (big-endian)
+RECORD_HEADER = struct.Struct(">II")
+
+
+def segment_name(writer_id: str, index: int) -> str:
+    return f"{writer_id}-{index:08d}.{SEGMENT_EXTENSION}"
+
+
+class EventLog:
+    """
+    Log de eventos append-only y segmentado para las detecciones.
+
+    Cada registro es un `DetectionRecord` codificado con msgpack, precedido por
+    `RECORD_HEADER` (longitud + CRC32), lo que permite detectar registros
+    truncados o corruptos sin depender de separadores.
+
+    Cada proceso escritor (un stream de cámara) usa sus propios segmentos
+    `<directory>/log/<writer_id>-<índice>.mpk`, de modo que no hay escritores
+    concurrentes sobre un mismo archivo. `append()` añade un lote de registros
+    con una sola escritura y un solo fsync; al superar `MAX_SEGMENT_BYTES` o
+    `MAX_SEGMENT_AGE_SECONDS` el segmento se cierra y se abre uno nuevo.
+
+    Los segmentos cerrados los elimina el lector (sync.service) una vez que los
+    confirmó, ver `EventLogReader` en sync.service. Tras cada lote se envía un
+    aviso no bloqueante al socket de sync.service para que sincronice sin sondear.
+    """
+
+    MAX_SEGMENT_BYTES = 4 * 1024 * 1024
+    MAX_SEGMENT_AGE_SECONDS = 3600
+
+    def __init__(self, directory: str, writer_id: str):
+        self.directory = os.path.join(directory, EVENT_LOG_SUBDIR)
+        self.writer_id = re.sub(r"[^A-Za-z0-9_.]", "_", str(writer_id or "default"))
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._file = None
+        self._index = self._last_index()
+        self._opened_at = 0.0
+        self._size = 0
+
+        self._notify_path = os.path.join(self.directory, NOTIFY_SOCKET_NAME)
+        self._notify_socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._notify_socket.setblocking(False)
+
+    def _last_index(self) -> int:
+        last = 0
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match and match.group("writer") == self.writer_id:
+                last = max(last, int(match.group("index")))
+        return last
+
+    def _open_segment(self):
+        # Siempre se empieza un segmento nuevo: si el proceso anterior murió a mitad
+        # de una escritura, su último registro incompleto queda aislado en su segmento.
+        self._index += 1
+        path = os.path.join(self.directory, segment_name(self.writer_id, self._index))
+        self._file = open(path, "ab", buffering=0)
+        self._opened_at = time.monotonic()
+        self._size = 0
+        print(f"[DEBUG_EVENT_LOG] Nuevo segmento: {path}")
+
+    def _should_rotate(self) -> bool:
+        return (
+            self._size >= self.MAX_SEGMENT_BYTES
+            or time.monotonic() - self._opened_at >= self.MAX_SEGMENT_AGE_SECONDS
+        )
+
+    def append(self, records: Iterable[bytes]) -> int:
+        """Añade los registros (ya codificados) y los lleva a disco. Retorna cuántos escribió."""
+        frames = [RECORD_HEADER.pack(len(record), zlib.crc32(record)) + record for record in records]
+        if not frames:
+            return 0
+
+        if self._file is None or self._should_rotate():
+            self.close()
+            self._open_segment()
+
+        data = b"".join(frames)
+        self._file.write(data)
+        os.fsync(self._file.fileno())
+        self._size += len(data)
+        self._notify()
+        return len(frames)
+
+    def _notify(self):
+        try:
+            self._notify_socket.sendto(b"1", self._notify_path)
+        except OSError:
+            # sync.service no está escuchando (o su buffer está lleno): su intervalo de respaldo lo cubre
+            pass
+
+    @property
+    def current_segment(self) -> Optional[str]:
+        return self._file.name if self._file is not None else None
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def shutdown(self):
+        self.close()
+        self._notify_socket.close()
@@ -9,35 +9,67 @@ import uuid as uuid_lib
 import traceback
 from typing import Dict, Any, List, Tuple, Optional 
 from src.ModelLoader import ModelLoader
+from src.FaceInferencePool import FaceInferencePool
+from src.DetectionRecord import DetectionRecord
+from src.DetectionBatch import DetectionBatch
+from src.FaceAssociation import FaceAssociation
+from src.DetectionWriter import DetectionWriter, DEFAULT_DETECTIONS_DIR
 
 class EventProcessor:
 
-    def __init__(self, config: Dict[str, Any], stream: Dict[str, Any]):
+    # Pools de inferencia facial por instancia de modelo (id(modelo) -> (modelo, pool))
+    _inference_pools: Dict[int, Tuple[Any, FaceInferencePool]] = {}
+    _inference_pools_lock = threading.Lock()
+
+    def __init__(self, config: Dict[str, Any], stream: Dict[str, Any], face_feature_model=None):
         print("[DEBUG_INIT] Inicializando EventProcessor...")
         self.config = config
         self.stream = stream
         self.callbacks = []
         self.event_tracker: Dict[int, Dict[str, Any]] = {} 
-        self.lock = threading.Lock()
-        self.base_storage_dir = "/opt/vhs/storage/detecciones"
-        os.makedirs(self.base_storage_dir, exist_ok=True)
+        # RLock: el pool puede notificar descartes de forma síncrona desde submit(),
+        # que se invoca con el lock ya tomado en analyze().
+        self.lock = threading.RLock()
+        # Mismo ajuste que lee sync.service, para que ambos usen el mismo directorio
+        self.base_storage_dir = config.get('base_storage_dir', DEFAULT_DETECTIONS_DIR)
+        self.detection_writer = DetectionWriter(self.base_storage_dir, writer_id=stream.get('id'))
+        # Las features crudas por inferencia solo se guardan si se piden explícitamente
+        self.store_raw_features = bool(config.get('store_raw_features', False))
         print(f"[DEBUG_INIT] Directorio de almacenamiento de detecciones: {self.base_storage_dir}")
 
         self.MAX_FACE_INFERENCES_PER_PERSON = 3
         self.INFERENCE_TIMEOUT_SECONDS = 15
         self.CLEANUP_GRACE_PERIOD = 1.0
         self.MIN_FACE_CROP_DIMENSION = 30 # 🟢 Nuevo: Dimensión mínima para un recorte de rostro válido
-
-        print("[DEBUG_INIT] Cargando modelos de rostro para CombiningCompoundModel...")
+        # Un único worker por instancia de modelo: el CombiningCompoundModel no admite
+        # llamadas `predict_batch` concurrentes y, en multi-stream, todas las cámaras lo comparten
+        self.FACE_INFERENCE_WORKERS = 1
+        self.FACE_INFERENCE_QUEUE_SIZE = 8
+        # Los rostros de un mismo frame se encolan casi a la vez: se agrupan en un solo lote
+        self.FACE_INFERENCE_MAX_BATCH = 8
+        self.FACE_INFERENCE_BATCH_WINDOW_SECONDS = 0.02
+
+        if face_feature_model is not None:
+            # Modelos compartidos (p. ej. modo multi-stream): no se cargan de nuevo
+            self.face_feature_model = face_feature_model
+        else:
+            self.face_feature_model = self.load_face_feature_model()
+
+        self.inference_pool = self._shared_inference_pool(self.face_feature_model)
+
+    @staticmethod
+    def load_face_feature_model():
+        print("[DEBUG_INIT] Registrando modelos de rostro (carga diferida) para CombiningCompoundModel...")
         try:
-            self.face_feature_model = degirum_tools.CombiningCompoundModel(
-                ModelLoader('yolov8n_relu6_fairface_gender--256x256_quant_hailort_hailo8l_1').load_model(),
-                ModelLoader('yolov8n_relu6_age--256x256_quant_hailort_hailo8l_1').load_model()
+            face_feature_model = degirum_tools.CombiningCompoundModel(
+                ModelLoader('yolov8n_relu6_fairface_gender--256x256_quant_hailort_hailo8l_1').lazy_model(),
+                ModelLoader('yolov8n_relu6_age--256x256_quant_hailort_hailo8l_1').lazy_model()
             )
-            print("[DEBUG_INIT] Modelos de rostro cargados exitosamente para EventProcessor.")
+            print("[DEBUG_INIT] Modelos de rostro registrados para EventProcessor; se cargan en la primera inferencia.")
         except Exception as e:
             print(f"[ERROR_INIT] Fallo al cargar los modelos de rostro: {e}")
             raise
+        return face_feature_model
 
     def add_callback(self, callback: callable):
         print("[INFO] Callback agregado.")
@@ -88,36 +120,65 @@ class EventProcessor:
             self.event_tracker[event['tid']] = event
             print(f"[DEBUG_ON_CROSS_INF] Evento {event['tid']} añadido al tracker. Tracker actual: {list(self.event_tracker.keys())}")
 
-    def save_person_data_to_json(self, person_data: Dict[str, Any]) -> bool:
+    def save_person_data_to_json(self, person_data: Dict[str, Any], remove_when_saved: bool = False) -> bool:
+        """
+        Serializa la detección y la encola en DetectionWriter. Retornar True solo
+        significa que quedó encolada: el evento se marca `save_pending` y sigue en el
+        tracker hasta que el escritor confirma que está en disco (`_on_person_data_saved`).
+        Si la escritura falla, el evento vuelve a quedar disponible para reintentar.
+        """
         print(f"[DEBUG_SAVE_JSON] save_person_data_to_json llamado para UUID: {person_data.get('uuid')}")
         uuid_val = person_data.get("uuid")
         if not uuid_val:
             print("[❌_SAVE_JSON] UUID faltante en los datos de la persona, no se guarda.")
             return False
 
-        filepath = os.path.join(self.base_storage_dir, f"{uuid_val}.json")
-        print(f"[DEBUG_SAVE_JSON] Intentando escribir JSON en: {filepath}")
+        # Solo se serializa y encola: la escritura en disco ocurre en el hilo de DetectionWriter
         try:
-            with open(filepath, 'w') as f:
-                json.dump(person_data, f, indent=4)
-            print(f"[✔_SAVE_JSON] Guardado JSON exitoso: {filepath}")
-            return True
-        except Exception as e:
-            print(f"[❌_SAVE_JSON] Error al guardar JSON '{filepath}': {e}")
+            record = DetectionRecord.build(person_data, include_raw_features=self.store_raw_features)
+            payload = DetectionRecord.encode(record)
+        except (TypeError, ValueError) as e:
+            print(f"[❌_SAVE_JSON] No se pudo serializar la detección {uuid_val}: {e}")
             return False
-        
+
+        person_data['save_pending'] = True
+        self.detection_writer.submit(
+            payload, record,
+            on_done=lambda ok: self._on_person_data_saved(person_data, ok, remove_when_saved),
+        )
+        print(f"[✔_SAVE_JSON] Detección {uuid_val} encolada para guardado.")
+        return True
+
+    def _on_person_data_saved(self, person_data: Dict[str, Any], ok: bool, remove_when_saved: bool):
+        """Callback del hilo de DetectionWriter: confirma (o revierte) el guardado de un evento."""
+        tid = person_data.get('tid')
+        with self.lock:
+            person_data['save_pending'] = False
+            if not ok:
+                person_data['save_failures'] = person_data.get('save_failures', 0) + 1
+                print(f"[ADVERTENCIA_SAVE_JSON] No se pudo guardar la detección {person_data.get('uuid')} (TID {tid}). "
+                      f"Se mantiene en tracker para reintentar.")
+                return
+
+            person_data['is_complete'] = True
+            print(f"[✔_SAVE_JSON] Detección {person_data.get('uuid')} guardada en disco.")
+            if remove_when_saved and self.event_tracker.get(tid) is person_data:
+                del self.event_tracker[tid]
+                print(f"[EVENT] 🗑️ Removido y guardado TID {tid} al finalizar seguimiento o por timeout/fallo.")
+                print(f"[DEBUG_CLEAR_TRACKER] TID {tid} eliminado del event_tracker. Nuevo tamaño: {len(self.event_tracker)}")
+
     def analyze(self, result, frame):
         print("[DEBUG_ANALYZE] analyze llamado.")
         MIN_FACE_SCORE = 0.6
         MAX_FACE_DISTANCE = 100
 
-        face_detecciones = [
-            d for d in result.results
-            if d.get('label', '').lower() == 'human face' and d.get('score', 0.0) >= MIN_FACE_SCORE
-        ]
-        print(f"[DEBUG_ANALYZE] Total rostros filtrados: {len(face_detecciones)}")
+        detections = DetectionBatch.of(result)
+        face_indices = detections.faces(MIN_FACE_SCORE)
+        face_boxes = detections.bboxes[face_indices]
+        face_centers = detections.centers(face_indices)
+        print(f"[DEBUG_ANALYZE] Total rostros filtrados: {len(face_indices)}")
         
-        current_tids = {res.get('track_id') for res in result.results if res.get('track_id') is not None}
+        current_tids = detections.track_id_set()
 
         with self.lock:
             event_tracker_tids = set(self.event_tracker.keys())
@@ -129,21 +190,17 @@ class EventProcessor:
             ]
             print(f"[DEBUG_ANALYZE] TIDs a eliminar: {tracks_to_delete}")
 
-        valid_results = [res for res in result.results if isinstance(res, dict) and isinstance(res.get('track_id'), int)]
-
-        for res in valid_results:
-            track_id = res.get('track_id')
+        candidates = []
+        for index in np.flatnonzero(detections.tracked):
+            track_id = int(detections.track_ids[index])
             
             if track_id not in event_tracker_tids:
                 continue
 
-            bbox = res.get('bbox')
+            bbox = detections.results[index].get('bbox')
             if not bbox:
                 continue
 
-            print(f"[DEBUG_ANALYZE] Procesando TID {track_id} con bbox {bbox}")
-            center = self._get_center(bbox)
-
             with self.lock:
                 enriched_event = self.event_tracker.get(track_id)
             
@@ -154,36 +211,17 @@ class EventProcessor:
                 print(f"[🛑] TID {track_id} saltado por dirección 'down'")
                 continue
 
-            faces_inside = []
-            bx1, by1, bx2, by2 = bbox
-            box_top = by1
-            box_bottom = by2
-            box_height = box_bottom - box_top
-            zone2_limit = box_top + 2 * box_height / 3
-            
-            print(f"[DEBUG_ANALYZE] Bbox de persona: {bbox}. Límite de zona 2: {zone2_limit}")
-
-            for f in face_detecciones:
-                face_bbox = f.get('bbox')
-                if not face_bbox:
-                    continue
-                fx1, fy1, fx2, fy2 = face_bbox
-                face_center_x, face_center_y = self._get_center(face_bbox)
+            candidates.append((track_id, index))
 
-                if (
-                    self._is_inside(face_bbox, bbox) and
-                    face_center_y <= zone2_limit and
-                    self._distance((face_center_x, face_center_y), center) < MAX_FACE_DISTANCE
-                ):
-                    faces_inside.append(f)
-
-            print(f"[DEBUG_ANALYZE] Rostros válidos dentro del bbox: {len(faces_inside)}")
-
-            if not faces_inside:
-                continue
+        # Una sola asignación rostro ↔ persona para todo el frame
+        assignments = self._associate_faces(
+            detections.bboxes[[index for _, index in candidates]], face_boxes, face_centers, MAX_FACE_DISTANCE
+        )
+        print(f"[DEBUG_ANALYZE] Personas candidatas: {len(candidates)}. Rostros asignados: {len(assignments)}")
 
-            best_face = max(faces_inside, key=lambda f: self._face_score(f['bbox'], center))
-            x1, y1, x2, y2 = map(int, best_face['bbox'])
+        for row, (face, face_quality) in assignments.items():
+            track_id = candidates[row][0]
+            x1, y1, x2, y2 = face_boxes[face].astype(int)
             face_crop = frame[y1:y2, x1:x2]
             
             # 🟢 Verificación de recorte de rostro más robusta
@@ -204,7 +242,10 @@ class EventProcessor:
                     enriched_event_current_state['last_inference_time'] = time.time()
                     enriched_event_current_state['inference_start_time'] = time.time() 
                     print(f"[INFO] 🔍 Iniciando inferencia para TID {track_id}")
-                    self.process_face_inference_async(enriched_event_current_state, face_crop)
+                    remaining_budget = self.MAX_FACE_INFERENCES_PER_PERSON - len(enriched_event_current_state['features'])
+                    self.process_face_inference_async(
+                        enriched_event_current_state, face_crop, priority=(remaining_budget, face_quality)
+                    )
                 else:
                     print(f"[DEBUG_ANALYZE] TID {track_id} ya alcanzó el máximo de inferencias, hay una en curso, o ha fallado demasiadas veces. No se procesa.")
         
@@ -215,8 +256,6 @@ class EventProcessor:
         print(f"[DEBUG_CLEAR_TRACKER] clear_event_tracker llamado con stale_tids: {stale_tids}")
         with self.lock:
             print("[DEBUG_CLEAR_TRACKER] Adquiriendo lock para clear_event_tracker.")
-            tids_to_remove_from_tracker = set()
-            
             stale_tids_filtered = [tid for tid in stale_tids if tid is not None]
             
             for tid in stale_tids_filtered:
@@ -225,6 +264,9 @@ class EventProcessor:
                 
                 if event_data is None or event_data.get('is_complete', False):
                     continue
+                if event_data.get('save_pending', False):
+                    # DetectionWriter aún no confirmó el guardado; lo elimina al confirmar
+                    continue
 
                 # 🟢 Solo se considera la limpieza si el evento ha existido durante el período de gracia
                 if time.time() - event_data.get('start_time', 0) < self.CLEANUP_GRACE_PERIOD:
@@ -249,26 +291,17 @@ class EventProcessor:
 
                 if should_save_and_remove:
                     print(f"[DEBUG_CLEAR_TRACKER] Intentando guardar JSON final para TID {tid}.")
-                    if self.save_person_data_to_json(event_data):
-                        event_data['is_complete'] = True
-                        print(f"[EVENT] 🗑️ Removido y guardado TID {tid} al finalizar seguimiento o por timeout/fallo.")
-                        tids_to_remove_from_tracker.add(tid)
-                    else:
+                    if not self.save_person_data_to_json(event_data, remove_when_saved=True):
                         print(f"[ADVERTENCIA_CLEAR_TRACKER] No se pudo guardar JSON para TID {tid}. Se mantiene en tracker para reintentar o depurar.")
-            
-            for tid in tids_to_remove_from_tracker:
-                if tid in self.event_tracker:
-                    del self.event_tracker[tid]
-                    print(f"[DEBUG_CLEAR_TRACKER] TID {tid} eliminado del event_tracker. Nuevo tamaño: {len(self.event_tracker)}")
             print("[DEBUG_CLEAR_TRACKER] Liberando lock después de clear_event_tracker.")
         print("[DEBUG_CLEAR_TRACKER] Fin de clear_event_tracker.")
 
-    def process_face_inference_async(self, enriched_event: Dict[str, Any], face_crop: np.ndarray):
-        print(f"[DEBUG_ASYNC_CALL] Iniciando hilo asíncrono para inferencia de rostro para TID {enriched_event.get('tid')}")
+    def process_face_inference_async(self, enriched_event: Dict[str, Any], face_crop: np.ndarray, priority: Tuple = (0, 0.0)):
+        print(f"[DEBUG_ASYNC_CALL] Encolando inferencia de rostro para TID {enriched_event.get('tid')} con prioridad {priority}")
         
-        # 🟢 Validar de forma robusta antes de iniciar el hilo
+        # 🟢 Validar de forma robusta antes de encolar el trabajo
         if not isinstance(face_crop, np.ndarray) or face_crop.size == 0 or face_crop.shape[0] < self.MIN_FACE_CROP_DIMENSION or face_crop.shape[1] < self.MIN_FACE_CROP_DIMENSION:
-            print(f"[ERROR_ASYNC_CALL] face_crop inválido o muy pequeño para TID {enriched_event.get('tid')}. No se inicia hilo de inferencia.")
+            print(f"[ERROR_ASYNC_CALL] face_crop inválido o muy pequeño para TID {enriched_event.get('tid')}. No se encola la inferencia.")
             with self.lock:
                 if enriched_event.get('tid') in self.event_tracker:
                     self.event_tracker[enriched_event.get('tid')]['inference_in_progress'] = False
@@ -277,12 +310,100 @@ class EventProcessor:
                     print(f"[DEBUG_ASYNC_CALL] Fallo de face_crop para TID {enriched_event.get('tid')}. Fallos acumulados: {self.event_tracker[enriched_event.get('tid')]['inference_failures']}")
             return
 
-        threading.Thread(
-            target=self._process_face_inference,
-            args=(enriched_event, face_crop),
-            daemon=True
-        ).start()
-        print(f"[DEBUG_ASYNC_CALL] Hilo para TID {enriched_event.get('tid')} iniciado.")
+        # Prioridad: (presupuesto restante de inferencias del track, calidad del rostro)
+        # Se copia el recorte: el frame se anota (y se reutiliza) mientras el trabajo espera en cola
+        if self.inference_pool.submit((self, enriched_event, face_crop.copy()), priority):
+            print(f"[DEBUG_ASYNC_CALL] Inferencia para TID {enriched_event.get('tid')} encolada. Profundidad de cola: {self.inference_pool.stats()['queue_depth']}")
+
+    def _shared_inference_pool(self, face_feature_model) -> FaceInferencePool:
+        """
+        Devuelve el pool de inferencia facial de `face_feature_model`, creándolo la
+        primera vez. Los EventProcessor que comparten modelo comparten también el pool,
+        de modo que nunca hay dos `predict_batch` en vuelo sobre la misma instancia.
+        """
+        with EventProcessor._inference_pools_lock:
+            key = id(face_feature_model)
+            if key not in EventProcessor._inference_pools:
+                pool = FaceInferencePool(
+                    batch_handler=EventProcessor._dispatch_face_inference_batch,
+                    on_shed=EventProcessor._dispatch_face_inference_shed,
+                    workers=self.FACE_INFERENCE_WORKERS,
+                    max_queue=self.FACE_INFERENCE_QUEUE_SIZE,
+                    max_batch=self.FACE_INFERENCE_MAX_BATCH,
+                    batch_window=self.FACE_INFERENCE_BATCH_WINDOW_SECONDS,
+                )
+                # Se guarda también el modelo para que su id no se reutilice mientras viva el pool
+                EventProcessor._inference_pools[key] = (face_feature_model, pool)
+            return EventProcessor._inference_pools[key][1]
+
+    @staticmethod
+    def _dispatch_face_inference_batch(jobs):
+        # Un lote puede mezclar recortes de varias cámaras: cada EventProcessor procesa los suyos
+        by_processor = {}
+        for processor, enriched_event, face_crop in jobs:
+            by_processor.setdefault(id(processor), (processor, []))[1].append((enriched_event, face_crop))
+        for processor, processor_jobs in by_processor.values():
+            processor._run_face_inference_batch(processor_jobs)
+
+    @staticmethod
+    def _dispatch_face_inference_shed(job):
+        processor, enriched_event, face_crop = job
+        processor._on_face_inference_shed((enriched_event, face_crop))
+
+    def _is_job_active(self, enriched_event: Dict[str, Any]) -> bool:
+        with self.lock:
+            if enriched_event.get('tid') not in self.event_tracker or enriched_event.get('is_complete', False):
+                print(f"[ADVERTENCIA_INFERENCE] El evento para TID {enriched_event.get('tid')} ya no está activo. Se omite la inferencia encolada.")
+                return False
+        return True
+
+    def _run_face_inference_job(self, job):
+        enriched_event, face_crop = job
+        if self._is_job_active(enriched_event):
+            self._process_face_inference(enriched_event, face_crop)
+
+    def _run_face_inference_batch(self, jobs):
+        """
+        Ejecuta los recortes de rostro de un lote (p. ej. todas las personas de un
+        frame) en una única llamada `predict_batch` a los modelos de género y edad,
+        y devuelve cada resultado a su entrada de `event_tracker`.
+        """
+        jobs = [job for job in jobs if self._is_job_active(job[0])]
+        if not jobs:
+            return
+        if len(jobs) == 1:
+            self._run_face_inference_job(jobs[0])
+            return
+
+        print(f"[DEBUG_INFERENCE] Lote de inferencia de rostro con {len(jobs)} recortes: TIDs {[job[0].get('tid') for job in jobs]}")
+        pending = {id(enriched_event): enriched_event for enriched_event, _ in jobs}
+        try:
+            for inference in self.face_feature_model.predict_batch(
+                (face_crop, enriched_event) for enriched_event, face_crop in jobs
+            ):
+                enriched_event = inference.info
+                pending.pop(id(enriched_event), None)
+                self._apply_face_inference(enriched_event, inference)
+        except Exception as e:
+            print(f"[❌] Error en lote de inferencia de rostro ({len(pending)} recortes sin resultado).")
+            traceback.print_exc()
+            for enriched_event in pending.values():
+                self._record_face_inference_failure(enriched_event, e)
+
+    def _on_face_inference_shed(self, job):
+        enriched_event, _ = job
+        tid = enriched_event.get('tid')
+        print(f"[⚠️] Cola de inferencia llena: se descarta la inferencia para TID {tid}.")
+        with self.lock:
+            # No cuenta como fallo: el track podrá reintentar en un frame posterior
+            enriched_event['inference_in_progress'] = False
+
+    def inference_stats(self) -> Dict[str, Any]:
+        """
+        Profundidad de cola, descartes y tiempos de espera del pool de inferencia facial.
+        En multi-stream el pool es compartido: las cifras agregan todas las cámaras.
+        """
+        return self.inference_pool.stats()
 
     def _process_face_inference(self, enriched_event, face_crop):
         tid = enriched_event.get('tid', 'unknown')
@@ -292,61 +413,72 @@ class EventProcessor:
         try:
             print(f"[DEBUG_INFERENCE_TRY] Realizando inferencia para TID {tid} con recorte de forma: {face_crop.shape}...")
             inference = self.face_feature_model(face_crop)
-            print(f"[DEBUG_INFERENCE_TRY] Inferencia completada para TID {tid}. Resultados: {inference.results}")
-
-            with self.lock:
-                if enriched_event.get('tid') not in self.event_tracker:
-                     print(f"[ADVERTENCIA_INFERENCE] El evento para TID {tid} ya fue eliminado del tracker. Se descartan los resultados de la inferencia.")
-                     return
-
-                enriched_event['features'].append(inference.results)
-                enriched_event['inference_in_progress'] = False
-                enriched_event['last_inference_time'] = time.time()
-                print(f"[✔] Inferencia completada y estado actualizado para TID {tid}. Total features: {len(enriched_event['features'])}")
-
-                if len(enriched_event['features']) >= self.MAX_FACE_INFERENCES_PER_PERSON:
-                    print(f"[INFO] 🎉 TID {tid} alcanzó el máximo de inferencias. Intentando guardar y finalizar.")
-                    if self.save_person_data_to_json(enriched_event):
-                        enriched_event['is_complete'] = True 
-                        print(f"[✔] JSON guardado completo para UUID {uuid}")
-                        
+            self._apply_face_inference(enriched_event, inference)
         except Exception as e:
             print(f"[❌] Error inferencia rostro para TID {tid} UUID {uuid}.")
             traceback.print_exc()
-            with self.lock:
-                if enriched_event.get('tid') in self.event_tracker:
-                    self.event_tracker[enriched_event.get('tid')]['inference_in_progress'] = False
-                    self.event_tracker[enriched_event.get('tid')]['error_during_inference'] = f"Inference failed with error: {str(e)}"
-                    self.event_tracker[enriched_event.get('tid')]['inference_failures'] = self.event_tracker[enriched_event.get('tid')].get('inference_failures', 0) + 1
-                    print(f"[DEBUG_INFERENCE] Fallo de inferencia para TID {tid}. Fallos acumulados: {self.event_tracker[enriched_event.get('tid')]['inference_failures']}")
-
-    def _get_center(self, bbox: Optional[Tuple[float, float, float, float]]) -> Tuple[float, float]:
-        if bbox is None:
-            return (0.0, 0.0) 
-        x1, y1, x2, y2 = bbox
-        return ((x1 + x2) / 2, (y1 + y2) / 2)
-
-    def _bbox_area(self, bbox: Optional[Tuple[float, float, float, float]]) -> float:
-        if bbox is None:
-            return 0.0
-        x1, y1, x2, y2 = bbox
-        return abs((x2 - x1) * (y2 - y1))
-
-    def _face_score(self, bbox_face: Optional[Tuple[float, float, float, float]], person_center: Tuple[float, float]) -> float:
-        if bbox_face is None:
-            return -1.0 
-        face_center = self._get_center(bbox_face)
-        score = self._bbox_area(bbox_face) / (1 + self._distance(face_center, person_center))
-        return score
-
-    def _distance(self, p1: Tuple[float, float], p2: Tuple[float, float]) -> float:
-        dist = ((p1[0] - p2[0])**2 + (p1[1] - p2[1])**2) ** 0.5
-        return dist
-
-    def _is_inside(self, small_box: Optional[Tuple[float, float, float, float]], big_box: Optional[Tuple[float, float, float, float]]) -> bool:
-        if small_box is None or big_box is None:
-            return False
-        sx1, sy1, sx2, sy2 = small_box
-        bx1, by1, bx2, by2 = big_box
-        is_inside = sx1 >= bx1 and sy1 >= by1 and sx2 <= bx2 and sy2 <= by2
-        return is_inside
\ No newline at end of file
+            self._record_face_inference_failure(enriched_event, e)
+
+    def _apply_face_inference(self, enriched_event, inference):
+        tid = enriched_event.get('tid', 'unknown')
+        uuid = enriched_event.get('uuid', 'unknown')
+        print(f"[DEBUG_INFERENCE_TRY] Inferencia completada para TID {tid}. Resultados: {inference.results}")
+
+        with self.lock:
+            if enriched_event.get('tid') not in self.event_tracker:
+                 print(f"[ADVERTENCIA_INFERENCE] El evento para TID {tid} ya fue eliminado del tracker. Se descartan los resultados de la inferencia.")
+                 return
+
+            enriched_event['features'].append(inference.results)
+            enriched_event['inference_in_progress'] = False
+            enriched_event['last_inference_time'] = time.time()
+            print(f"[✔] Inferencia completada y estado actualizado para TID {tid}. Total features: {len(enriched_event['features'])}")
+
+            if len(enriched_event['features']) >= self.MAX_FACE_INFERENCES_PER_PERSON and not enriched_event.get('save_pending', False):
+                print(f"[INFO] 🎉 TID {tid} alcanzó el máximo de inferencias. Intentando guardar y finalizar.")
+                # `is_complete` lo marca el callback de DetectionWriter cuando el guardado es durable
+                if self.save_person_data_to_json(enriched_event):
+                    print(f"[✔] JSON encolado completo para UUID {uuid}")
+
+    def _record_face_inference_failure(self, enriched_event, error: Exception):
+        tid = enriched_event.get('tid')
+        with self.lock:
+            if tid in self.event_tracker:
+                self.event_tracker[tid]['inference_in_progress'] = False
+                self.event_tracker[tid]['error_during_inference'] = f"Inference failed with error: {str(error)}"
+                self.event_tracker[tid]['inference_failures'] = self.event_tracker[tid].get('inference_failures', 0) + 1
+                print(f"[DEBUG_INFERENCE] Fallo de inferencia para TID {tid}. Fallos acumulados: {self.event_tracker[tid]['inference_failures']}")
+
+    def _associate_faces(self, person_boxes: np.ndarray, face_boxes: np.ndarray, face_centers: np.ndarray,
+                         max_face_distance: float) -> Dict[int, Tuple[int, float]]:
+        """
+        Asigna a cada persona (fila de `person_boxes`) como máximo un rostro y viceversa.
+
+        Un par es válido si el rostro está completamente dentro del bbox de la persona,
+        su centro cae en los 2/3 superiores del bbox y está a menos de
+        `max_face_distance` del centro de la persona. La calidad del par es
+        área_rostro / (1 + distancia). Retorna {fila_persona: (índice_rostro, calidad)}.
+        """
+        if len(person_boxes) == 0 or len(face_boxes) == 0:
+            return {}
+
+        person_centers = np.stack(
+            ((person_boxes[:, 0] + person_boxes[:, 2]) / 2, (person_boxes[:, 1] + person_boxes[:, 3]) / 2), axis=1
+        )
+        zone2_limits = person_boxes[:, 1] + 2 * (person_boxes[:, 3] - person_boxes[:, 1]) / 3
+        distances = np.hypot(
+            face_centers[None, :, 0] - person_centers[:, None, 0],
+            face_centers[None, :, 1] - person_centers[:, None, 1],
+        )
+        valid = (
+            FaceAssociation.containment_matrix(person_boxes, face_boxes)
+            & (face_centers[None, :, 1] <= zone2_limits[:, None])
+            & (distances < max_face_distance)
+        )
+        face_areas = np.abs((face_boxes[:, 2] - face_boxes[:, 0]) * (face_boxes[:, 3] - face_boxes[:, 1]))
+        qualities = face_areas[None, :] / (1 + distances)
+
+        return {
+            row: (face, float(qualities[row, face]))
+            for row, face in FaceAssociation.match(qualities, valid).items()
+        }
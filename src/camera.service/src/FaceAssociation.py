@@ -0,0 +1,64 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from typing import Dict
+
+
+class FaceAssociation:
+    """
+    Asociación rostro ↔ track en una sola pasada por frame.
+
+    En lugar de comparar cada rostro contra cada persona con bucles de Python,
+    calcula matrices (tracks × rostros) de IoU / contención con NumPy y resuelve la
+    asignación uno a uno con el algoritmo húngaro (`linear_sum_assignment`),
+    maximizando la puntuación de los pares válidos. Cada rostro queda asignado
+    como máximo a un track y cada track como máximo a un rostro.
+    """
+
+    @staticmethod
+    def iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+        """IoU entre todas las cajas [x1, y1, x2, y2] de `boxes_a` (N) y `boxes_b` (M) → (N, M)."""
+        a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)[:, None, :]
+        b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)[None, :, :]
+        inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+        inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+        intersection = inter_w * inter_h
+        area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+        area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+        union = area_a + area_b - intersection
+        return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+    @staticmethod
+    def containment_matrix(outer: np.ndarray, inner: np.ndarray) -> np.ndarray:
+        """(N, M) booleano: la caja `inner[j]` está completamente dentro de `outer[i]`."""
+        o = np.asarray(outer, dtype=np.float32).reshape(-1, 4)[:, None, :]
+        i = np.asarray(inner, dtype=np.float32).reshape(-1, 4)[None, :, :]
+        return (
+            (i[..., 0] >= o[..., 0]) & (i[..., 1] >= o[..., 1]) &
+            (i[..., 2] <= o[..., 2]) & (i[..., 3] <= o[..., 3])
+        )
+
+    @staticmethod
+    def match(scores: np.ndarray, valid: np.ndarray) -> Dict[int, int]:
+        """
+        Asignación uno a uno fila → columna que maximiza la suma de `scores` entre
+        los pares marcados en `valid`. Las filas sin ningún par válido no aparecen.
+        """
+        valid = np.asarray(valid, dtype=bool)
+        if valid.size == 0 or not valid.any():
+            return {}
+
+        # Solo entran al húngaro las filas/columnas con algún candidato
+        rows = np.flatnonzero(valid.any(axis=1))
+        cols = np.flatnonzero(valid.any(axis=0))
+        sub_valid = valid[np.ix_(rows, cols)]
+        sub_scores = np.asarray(scores, dtype=np.float64)[np.ix_(rows, cols)]
+
+        # Los pares inválidos reciben un costo mayor que cualquier par válido
+        cost = np.where(sub_valid, -sub_scores, 0.0)
+        cost[~sub_valid] = np.abs(cost[sub_valid]).sum() + 1.0
+        row_ind, col_ind = linear_sum_assignment(cost)
+
+        return {
+            int(rows[r]): int(cols[c])
+            for r, c in zip(row_ind, col_ind) if sub_valid[r, c]
+        }
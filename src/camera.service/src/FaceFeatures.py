@@ -4,14 +4,16 @@ from src.ModelLoader import ModelLoader
 
 class FaceFeatures:
     
+    # Proxies diferidos: los modelos no se cargan al importar el módulo,
+    # solo en la primera inferencia (y se comparten vía el registro de ModelLoader).
     model = degirum_tools.CombiningCompoundModel(
         degirum_tools.CombiningCompoundModel(
-            ModelLoader('yolov8s_relu6_peta_pedestrian_attributes--128x256_quant_hailort_hailo8l_1').load_model(),
-            ModelLoader('yolov8n_relu6_fairface_gender--256x256_quant_hailort_hailo8l_1').load_model(),
+            ModelLoader('yolov8s_relu6_peta_pedestrian_attributes--128x256_quant_hailort_hailo8l_1').lazy_model(),
+            ModelLoader('yolov8n_relu6_fairface_gender--256x256_quant_hailort_hailo8l_1').lazy_model(),
         ),
         degirum_tools.CombiningCompoundModel(
-            ModelLoader('yolov8n_relu6_age--256x256_quant_hailort_hailo8l_1').load_model(),
-            ModelLoader('yolov8n_imdbage_bmse--224x224_quant_hailort_multidevice_2').load_model(),
+            ModelLoader('yolov8n_relu6_age--256x256_quant_hailort_hailo8l_1').lazy_model(),
+            ModelLoader('yolov8n_imdbage_bmse--224x224_quant_hailort_multidevice_2').lazy_model(),
         )
     )
     
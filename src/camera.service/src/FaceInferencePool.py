@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from src.StageLatency import StageLatency
+
+
+class FaceInferencePool:
+    """
+    Pool fijo de hilos con una cola de prioridad acotada para la inferencia de
+    atributos faciales (género/edad).
+
+    - `submit(item, priority)` encola un trabajo; la prioridad es una tupla
+      comparable y los valores más altos se atienden primero.
+    - Si la cola está llena, se descarta el trabajo de menor prioridad (el nuevo
+      o el peor encolado) y se notifica con `on_shed(item)`.
+    - Con `batch_handler` y `max_batch > 1`, cada hilo agrupa hasta `max_batch`
+      trabajos que lleguen dentro de `batch_window` segundos (p. ej. los rostros
+      de un mismo frame) y los entrega juntos en una sola llamada.
+    - `stats()` expone profundidad de cola, descartes y tiempos de espera.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[Callable[[Any], None]] = None,
+        on_shed: Optional[Callable[[Any], None]] = None,
+        workers: int = 2,
+        max_queue: int = 8,
+        name: str = "face-inference",
+        batch_handler: Optional[Callable[[List[Any]], None]] = None,
+        max_batch: int = 1,
+        batch_window: float = 0.0,
+    ):
+        if handler is None and batch_handler is None:
+            raise ValueError("FaceInferencePool necesita `handler` o `batch_handler`.")
+
+        self.handler = handler
+        self.on_shed = on_shed
+        self.max_queue = max_queue
+        self.name = name
+        self.batch_handler = batch_handler
+        self.max_batch = max(1, max_batch) if batch_handler is not None else 1
+        self.batch_window = batch_window
+
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+        self.submitted = 0
+        self.processed = 0
+        self.shed = 0
+        self.batches = 0
+        self.latency = StageLatency()
+
+        self._workers = [
+            threading.Thread(target=self._worker_loop, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, item: Any, priority: Tuple) -> bool:
+        """Encola `item`. Retorna False si fue descartado por falta de espacio."""
+        shed_item = None
+        accepted = True
+
+        with self._cond:
+            if self._stopped:
+                return False
+
+            entry = (_negate(priority), next(self._counter), time.perf_counter(), item)
+            self.submitted += 1
+
+            if len(self._heap) >= self.max_queue:
+                worst_index = max(range(len(self._heap)), key=lambda i: self._heap[i][:2])
+                if self._heap[worst_index][:2] > entry[:2]:
+                    # El nuevo trabajo es mejor que el peor encolado: se reemplaza
+                    shed_item = self._heap[worst_index][3]
+                    self._heap[worst_index] = self._heap[-1]
+                    self._heap.pop()
+                    heapq.heapify(self._heap)
+                else:
+                    shed_item = item
+                    accepted = False
+                self.shed += 1
+
+            if accepted:
+                heapq.heappush(self._heap, entry)
+                self._cond.notify()
+
+        if shed_item is not None and self.on_shed is not None:
+            self.on_shed(shed_item)
+        return accepted
+
+    def _next_batch(self) -> Optional[List[Tuple[float, Any]]]:
+        """Bloquea hasta tener al menos un trabajo y agrupa los que lleguen dentro de la ventana."""
+        with self._cond:
+            while not self._heap and not self._stopped:
+                self._cond.wait()
+            if self._stopped:
+                return None
+
+            batch = [self._pop()]
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                if self._heap:
+                    batch.append(self._pop())
+                    continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or self._stopped:
+                    break
+                self._cond.wait(remaining)
+            return batch
+
+    def _pop(self) -> Tuple[float, Any]:
+        _, _, enqueued_at, item = heapq.heappop(self._heap)
+        return enqueued_at, item
+
+    def _worker_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started_at = time.perf_counter()
+            for enqueued_at, _ in batch:
+                self.latency.add("queue_wait", started_at - enqueued_at)
+
+            items = [item for _, item in batch]
+            try:
+                if self.batch_handler is not None:
+                    self.batch_handler(items)
+                else:
+                    self.handler(items[0])
+            except Exception:
+                print(f"[❌] Error no controlado en {threading.current_thread().name}.")
+                traceback.print_exc()
+            self.latency.add("inference", time.perf_counter() - started_at)
+
+            with self._cond:
+                self.processed += len(items)
+                self.batches += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            depth = len(self._heap)
+        return {
+            "queue_depth": depth,
+            "max_queue": self.max_queue,
+            "workers": len(self._workers),
+            "submitted": self.submitted,
+            "processed": self.processed,
+            "shed": self.shed,
+            "batches": self.batches,
+            "avg_batch_size": round(self.processed / self.batches, 2) if self.batches else 0.0,
+            "latency": self.latency.report(),
+        }
+
+    def stop(self, timeout: float = 2.0):
+        """Detiene los hilos; los trabajos aún encolados se descartan vía `on_shed`."""
+        with self._cond:
+            self._stopped = True
+            pending = [entry[3] for entry in self._heap]
+            self._heap.clear()
+            self._cond.notify_all()
+        if self.on_shed is not None:
+            for item in pending:
+                self.on_shed(item)
+        for worker in self._workers:
+            worker.join(timeout)
+
+
+def _negate(priority: Tuple) -> Tuple:
+    return tuple(-value for value in priority)
@@ -1,15 +1,25 @@
 import numpy as np
 import cv2
+import time
 import degirum_tools
 from src.ModelLoader import ModelLoader
 from src.CustomLineCounter import CustomLineCounter
+from src.LineCrossingEngine import LineCrossingEngine
 from src.EventProcessor import EventProcessor
-from typing import Tuple, Dict, Any
+from src.DetectionBatch import DetectionBatch
+from typing import Tuple, Dict, Any, Iterable, Iterator
 from src.HeatMap import HeatMap
+from src.StageLatency import StageLatency
 
 class FrameProcessor:
+
+    LATENCY_LOG_EVERY_N_FRAMES = 300
     
-    def __init__(self, config: Dict[str, Any], stream: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], stream: Dict[str, Any], combined_model=None, face_feature_model=None):
+        """
+        `combined_model` y `face_feature_model` permiten inyectar modelos ya cargados
+        y compartidos entre varios streams; si se omiten, se cargan aquí.
+        """
         self.stream = stream
 
         self.tracker = degirum_tools.ObjectTracker(
@@ -22,13 +32,12 @@ class FrameProcessor:
             annotation_color=(255, 0, 0),
         )
         
-        self.event_processor = EventProcessor(config, stream)
+        self.event_processor = EventProcessor(config, stream, face_feature_model=face_feature_model)
         self.line_counters = self.create_counters(stream)
+        # Todas las líneas se evalúan juntas; los contadores conservan conteos, callbacks y anotación
+        self.line_engine = LineCrossingEngine(self.line_counters)
         
-        self.combined_model = degirum_tools.CombiningCompoundModel(
-            ModelLoader('yolo11n_silu_coco--640x640_quant_hailort_hailo8l_1').load_model(),
-            ModelLoader('yolov8n_relu6_face--640x640_quant_hailort_hailo8l_1').load_model()
-        )
+        self.combined_model = combined_model or self.load_detection_model()
         
         self.heatmap = HeatMap(
             model=self.combined_model,
@@ -37,13 +46,85 @@ class FrameProcessor:
             decay_factor=0.9
         )
 
+        self.latency = StageLatency()
+        self.frames_processed = 0
+
         print("[✔] FrameProcessor inicializado")
 
+    @staticmethod
+    def load_detection_model():
+        return degirum_tools.CombiningCompoundModel(
+            ModelLoader('yolo11n_silu_coco--640x640_quant_hailort_hailo8l_1').lazy_model(),
+            ModelLoader('yolov8n_relu6_face--640x640_quant_hailort_hailo8l_1').lazy_model()
+        )
+
     def execute(self, frame: np.ndarray) -> Tuple[np.ndarray, bool]:
         
         #heat_map    = self.heatmap.analyze(frame)
+        started_at  = time.perf_counter()
         result      = self.combined_model(frame)
-        
+        inferred_at = time.perf_counter()
+
+        frame = self._post_process(result, frame)
+
+        self._record_latency(inference=inferred_at - started_at, postprocess=time.perf_counter() - inferred_at)
+        return frame, True
+
+    def execute_stream(self, frames: Iterable[np.ndarray]) -> Iterator[Tuple[np.ndarray, bool]]:
+        """
+        Versión en pipeline de `execute`: alimenta los frames al modelo a través de
+        `predict_batch`, de modo que la inferencia del frame N+1 en el acelerador se
+        solapa con el post-procesamiento (tracking, líneas, eventos, anotación) del
+        frame N. Entrega `(frame_procesado, True)` por cada frame, en orden.
+        """
+        def tagged_frames():
+            for frame in frames:
+                # frame_info viaja con el resultado: frame original + instante de envío
+                yield frame, (frame, time.perf_counter())
+
+        waiting_since = time.perf_counter()
+        for result in self.combined_model.predict_batch(tagged_frames()):
+            frame, submitted_at = result.info
+            yield self.handle_result(result, frame, submitted_at, waiting_since), True
+            waiting_since = time.perf_counter()
+
+    def handle_result(self, result, frame: np.ndarray, submitted_at: float, waiting_since: float) -> np.ndarray:
+        """
+        Post-procesa un resultado obtenido fuera de `execute` (vía `predict_batch`)
+        y registra sus latencias. Usado por `execute_stream` y por el planificador
+        multi-stream, que comparte un único pipeline de inferencia entre cámaras.
+        """
+        received_at = time.perf_counter()
+        frame = self._post_process(result, frame)
+
+        done_at = time.perf_counter()
+        self._record_latency(
+            inference_wait=received_at - waiting_since,
+            postprocess=done_at - received_at,
+            end_to_end=done_at - submitted_at,
+        )
+        return frame
+
+    def _record_latency(self, **stages: float):
+        for stage, seconds in stages.items():
+            self.latency.add(stage, seconds)
+        self.frames_processed += 1
+        if self.frames_processed % self.LATENCY_LOG_EVERY_N_FRAMES == 0:
+            print(f"[⏱] Latencia por etapa ({self.stream.get('code')}): {self.latency.format()}")
+            line_state = self.line_engine.stats()
+            print(
+                f"[⏱] Estado de líneas ({self.stream.get('code')}): tracks={line_state['size']} "
+                f"filas={line_state['capacity']} desalojados={line_state['evicted']}"
+            )
+            pool_stats = self.event_processor.inference_stats()
+            print(
+                f"[⏱] Pool de inferencia facial ({self.stream.get('code')}): cola={pool_stats['queue_depth']}/{pool_stats['max_queue']} "
+                f"procesadas={pool_stats['processed']} descartadas={pool_stats['shed']} | {self.event_processor.inference_pool.latency.format()}"
+            )
+            for model_name, load in ModelLoader.stats().items():
+                print(f"[⏱] Modelo {model_name}: carga={load['load_seconds']}s RSS={load['rss_delta_mb']:+} MB")
+
+    def _post_process(self, result, frame: np.ndarray) -> np.ndarray:
         self.filtrar_detecciones_validas(result.results)
 
         if len(result.results) > 0:
@@ -64,28 +145,27 @@ class FrameProcessor:
             # --- FIN DEL CÓDIGO CORREGIDO ---
 
             self.tracker.analyze(result)
+            # El tracker agrega los track_id: el batch compartido del frame se arma aquí, una sola vez
+            detections = DetectionBatch.attach(result)
 
-            for counter in self.line_counters:
-                counter.analyze(result)
+            self.line_engine.analyze(result)
 
             self.event_processor.analyze(result, frame)
 
             frame = self.tracker.annotate(result, frame)
 
-            for res in result.results:
-                label = res.get('label', '').lower()
-                if label == 'human face':
-                    x1, y1, x2, y2 = map(int, res['bbox'])
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    track_id = res.get('track_id')
-                    if track_id is not None:
-                        cv2.putText(frame, f'ID: {track_id}', (x1, y1 - 5),
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
+            for i in detections.faces():
+                x1, y1, x2, y2 = detections.bboxes[i].astype(int)
+                cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+                track_id = detections.results[i].get('track_id')
+                if track_id is not None:
+                    cv2.putText(frame, f'ID: {track_id}', (x1, y1 - 5),
+                                cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 255, 0), 1)
 
         for counter in self.line_counters:
             frame = counter.annotate(frame)
         
-        return frame, True
+        return frame
 
     def filtrar_detecciones_validas(self, result_list: list):
         indices_a_eliminar = []
@@ -0,0 +1,214 @@
+import os
+import shlex
+import signal
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+BACKEND_GSTREAMER = "gstreamer"
+TEST_SOURCE_URLS = ("videotestsrc", "test://")
+
+
+def uses_gstreamer(stream: Dict[str, Any]) -> bool:
+    """True si el stream se captura con GstPipeline (frames ya recortados y redimensionados)."""
+    return stream.get('input', {}).get('backend') == BACKEND_GSTREAMER
+
+
+class GstPipeline:
+    """
+    Backend de captura basado en GStreamer (`gst-launch-1.0`, igual que get_coords.py).
+
+    Construye a partir de `stream['input']` y `stream['roi']` un pipeline
+
+        fuente → decodebin → videorate → videocrop (ROI) → videoscale (add-borders)
+               → videoconvert → BGR de `target_size` → fdsink
+
+    de modo que el recorte del ROI y el letterbox a tamaño de modelo ocurren dentro
+    del pipeline de decodificación y Python recibe directamente frames listos para
+    inferencia, sin copia a resolución completa ni resize en CPU.
+
+    Los offsets de `videocrop` están en píxeles de `input.size`; un capsfilter con
+    esa resolución delante del recorte hace que el pipeline falle (not-negotiated)
+    si la cámara entrega otra, y `grab()` lo reporta como error de configuración
+    (`fatal_error`) en lugar de recortar una región equivocada.
+
+    Fuentes soportadas según `input.url`:
+    - `rtsp://...`: cámara.
+    - ruta o `file://...`: archivo de video (en bucle no; termina al final).
+    - `videotestsrc` o `test://`: patrón de prueba, para trabajar sin cámara.
+    Una URL vacía es un error de configuración (`ValueError`).
+
+    Expone la misma interfaz mínima que `cv2.VideoCapture` usada por StreamCapture
+    (`isOpened`, `grab`, `retrieve`, `read`, `release`).
+    """
+
+    RTSP_LATENCY_MS = 100
+
+    def __init__(self, stream: Dict[str, Any], target_size: Tuple[int, int] = (640, 640), framerate: float = 0):
+        self.stream = stream
+        self.target_w, self.target_h = target_size
+        self.framerate = framerate or 0
+        self.frame_bytes = self.target_w * self.target_h * 3
+
+        # Buffer reutilizado entre frames: el anillo compartido ya hace su propia copia
+        self._buffer = bytearray(self.frame_bytes)
+        self._frame = np.frombuffer(self._buffer, dtype=np.uint8).reshape(self.target_h, self.target_w, 3)
+        self._process: Optional[subprocess.Popen] = None
+        # stderr va a un archivo temporal: un pipe sin leer podría llenarse y bloquear gst-launch
+        self._stderr = None
+        self._has_frame = False
+        # Motivo por el que reconectar no tiene sentido (p. ej. input.size incorrecto)
+        self.fatal_error: Optional[str] = None
+
+    # ------------------------------------------------------------------
+    # Construcción del pipeline
+    # ------------------------------------------------------------------
+
+    def _source(self) -> List[str]:
+        url = self.stream['input'].get('url', '') or ''
+        if not url:
+            raise ValueError(
+                f"El stream {self.stream.get('id')} no define input.url. "
+                f"Para el patrón de prueba usa explícitamente 'videotestsrc' o 'test://'."
+            )
+        if url.startswith(TEST_SOURCE_URLS):
+            width, height = self.stream['input'].get('size', [1920, 1080])
+            fps = int(self.framerate) or 15
+            return [
+                "videotestsrc", "is-live=true", "pattern=ball",
+                "!", f"video/x-raw,width={width},height={height},framerate={fps}/1",
+            ]
+        if url.startswith("rtsp://"):
+            return [
+                "rtspsrc", f"location={url}", f"latency={self.RTSP_LATENCY_MS}", "protocols=tcp",
+                "!", "decodebin",
+            ]
+        path = url[len("file://"):] if url.startswith("file://") else url
+        return ["filesrc", f"location={path}", "!", "decodebin"]
+
+    def _crop(self) -> List[str]:
+        """
+        `videocrop` con el bounding box del ROI, en píxeles de la resolución de
+        `input.size`, precedido por un capsfilter que exige esa resolución.
+        """
+        roi = self.stream.get('roi') or {}
+        points = roi.get('points') or []
+        if not points:
+            return []
+
+        size = self.stream['input'].get('size')
+        if not size:
+            raise ValueError(
+                f"El stream {self.stream.get('id')} usa backend gstreamer con ROI pero no define input.size: "
+                f"se necesita la resolución real de la cámara para recortar el ROI."
+            )
+        frame_w, frame_h = size
+        x, y, w, h = cv2.boundingRect(np.array(points, dtype=np.int32))
+        left, top = max(0, x), max(0, y)
+        right, bottom = max(0, frame_w - (x + w)), max(0, frame_h - (y + h))
+        if w == 0 or h == 0 or left + right >= frame_w or top + bottom >= frame_h:
+            print(f"[⚠️] ROI inválido para GstPipeline ({x}, {y}, {w}, {h}); se usa el frame completo.")
+            return []
+        return [
+            "!", f"video/x-raw,width={frame_w},height={frame_h}",
+            "!", "videocrop", f"left={left}", f"top={top}", f"right={right}", f"bottom={bottom}",
+        ]
+
+    def command(self) -> List[str]:
+        rate = ["!", "videorate", "drop-only=true", "!", f"video/x-raw,framerate={int(self.framerate)}/1"] \
+            if self.framerate > 0 else []
+        return [
+            "gst-launch-1.0", "-q",
+            *self._source(),
+            *rate,
+            *self._crop(),
+            # add-borders + pixel-aspect-ratio=1/1: letterbox centrado, igual que resize_with_padding
+            "!", "videoscale", "add-borders=true",
+            "!", "videoconvert",
+            "!", f"video/x-raw,format=BGR,width={self.target_w},height={self.target_h},pixel-aspect-ratio=1/1",
+            "!", "fdsink", "fd=1", "sync=false",
+        ]
+
+    # ------------------------------------------------------------------
+    # Interfaz tipo cv2.VideoCapture
+    # ------------------------------------------------------------------
+
+    def open(self) -> bool:
+        command = self.command()
+        print(f"[DEBUG_GST] Iniciando pipeline: {shlex.join(command)}")
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(
+                command, stdout=subprocess.PIPE, stderr=self._stderr,
+                bufsize=0, preexec_fn=os.setsid
+            )
+        except FileNotFoundError:
+            print("[❌] 'gst-launch-1.0' no encontrado. Asegúrate de que GStreamer está instalado y en tu PATH.")
+            self._process = None
+            self._stderr.close()
+            self._stderr = None
+        return self.isOpened()
+
+    def isOpened(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def grab(self) -> bool:
+        """Lee el siguiente frame completo del pipeline en el buffer interno."""
+        self._has_frame = False
+        if self._process is None:
+            return False
+        view = memoryview(self._buffer)
+        received = 0
+        while received < self.frame_bytes:
+            n = self._process.stdout.readinto(view[received:])
+            if not n:
+                self._report_exit()
+                return False
+            received += n
+        self._has_frame = True
+        return True
+
+    def _report_exit(self):
+        """Muestra por qué terminó el pipeline; la resolución incorrecta se reporta como error de configuración."""
+        try:
+            self._process.wait(timeout=2)
+            self._stderr.seek(0)
+            errors = self._stderr.read().decode(errors="replace").strip()
+        except (subprocess.TimeoutExpired, OSError, ValueError):
+            return
+        if "not-negotiated" in errors or "not negotiated" in errors:
+            width, height = self.stream['input'].get('size', ["?", "?"])
+            self.fatal_error = (
+                f"Error de configuración en el stream {self.stream.get('id')}: la resolución de la cámara no "
+                f"coincide con input.size={width}x{height}, usada para recortar el ROI. Corrige input.size en config.json."
+            )
+            print(f"[❌] {self.fatal_error}")
+        elif errors:
+            print(f"[⚠️] GStreamer terminó: {errors.splitlines()[-1]}")
+
+    def retrieve(self) -> Tuple[bool, Optional[np.ndarray]]:
+        # Vista sobre el buffer interno: válida hasta el próximo grab()
+        return (True, self._frame) if self._has_frame else (False, None)
+
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        return self.retrieve() if self.grab() else (False, None)
+
+    def release(self):
+        if self._process is None:
+            return
+        try:
+            os.killpg(os.getpgid(self._process.pid), signal.SIGTERM)
+            self._process.wait(timeout=5)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            try:
+                os.killpg(os.getpgid(self._process.pid), signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        finally:
+            self._process.stdout.close()
+            self._process = None
+            if self._stderr is not None:
+                self._stderr.close()
+                self._stderr = None
@@ -0,0 +1,200 @@
+import numpy as np
+import degirum_tools
+from typing import Any, Dict, List, Tuple
+from src.CustomLineCounter import CustomLineCounter
+from src.DetectionBatch import DetectionBatch
+from src.TrackStateStore import TrackStateStore
+
+UNKNOWN_SIDE = -1
+
+
+def bbox_anchor_points(boxes: np.ndarray, anchor_type: degirum_tools.AnchorPoint) -> np.ndarray:
+    """Punto de anclaje (`anchor_type`) de cada caja [x1, y1, x2, y2]: (N, 4) → (N, 2)."""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+    if anchor_type == degirum_tools.AnchorPoint.BOTTOM_CENTER:
+        return np.stack((cx, y2), axis=1)
+    if anchor_type == degirum_tools.AnchorPoint.TOP_CENTER:
+        return np.stack((cx, y1), axis=1)
+    if anchor_type == degirum_tools.AnchorPoint.BOTTOM_LEFT:
+        return np.stack((x1, y2), axis=1)
+    if anchor_type == degirum_tools.AnchorPoint.BOTTOM_RIGHT:
+        return np.stack((x2, y2), axis=1)
+    return np.stack((cx, cy), axis=1)
+
+
+def _orientation(p: Tuple[np.ndarray, np.ndarray], q: Tuple[np.ndarray, np.ndarray],
+                 r: Tuple[np.ndarray, np.ndarray]) -> np.ndarray:
+    """Orientación del triplete (p, q, r): 0 colineal, 1 horario, 2 antihorario."""
+    val = (q[1] - p[1]) * (r[0] - q[0]) - (q[0] - p[0]) * (r[1] - q[1])
+    return np.where(val == 0, 0, np.where(val > 0, 1, 2))
+
+
+def _on_segment(p, q, r) -> np.ndarray:
+    return (
+        (q[0] <= np.maximum(p[0], r[0])) & (q[0] >= np.minimum(p[0], r[0])) &
+        (q[1] <= np.maximum(p[1], r[1])) & (q[1] >= np.minimum(p[1], r[1]))
+    )
+
+
+def segments_intersect(p1, q1, p2, q2) -> np.ndarray:
+    """
+    Test de intersección de segmentos p1-q1 contra p2-q2 con broadcasting: cada
+    argumento es un par (x, y) de arrays. Incluye los casos colineales.
+    """
+    o1 = _orientation(p1, q1, p2)
+    o2 = _orientation(p1, q1, q2)
+    o3 = _orientation(p2, q2, p1)
+    o4 = _orientation(p2, q2, q1)
+
+    general = (o1 != 0) & (o2 != 0) & (o3 != 0) & (o4 != 0) & (o1 != o2) & (o3 != o4)
+    return (
+        general
+        | ((o1 == 0) & _on_segment(p1, p2, q1))
+        | ((o2 == 0) & _on_segment(p1, q2, q1))
+        | ((o3 == 0) & _on_segment(p2, p1, q2))
+        | ((o4 == 0) & _on_segment(p2, q1, q2))
+    )
+
+
+class LineCrossingEngine:
+    """
+    Evalúa todas las líneas de conteo de un stream en una sola pasada vectorizada.
+
+    Las líneas configuradas (los `CustomLineCounter` de FrameProcessor) se guardan
+    como arrays (L, ·) y el estado por track (lado anterior y si ya se contó) como
+    matrices (tracks × L). Por frame se calculan con NumPy, para todos los tracks
+    contra todas las líneas a la vez, el lado actual y la intersección del último
+    movimiento; solo los cruces confirmados vuelven a Python, donde cada contador
+    actualiza sus conteos y ejecuta sus `on_cross_callbacks`.
+
+    Reglas: filtro por `class_list`, lado inicial con la primera posición conocida,
+    cruce cuando cambia el lado y el segmento intersecta la línea, y
+    `count_first_crossing`.
+    """
+
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, counters: List[CustomLineCounter]):
+        self.counters = counters
+        count = len(counters)
+        lines = np.array([c.line for c in counters], dtype=np.float64).reshape(count, 4)
+        self._p1 = (lines[:, 0], lines[:, 1])
+        self._q1 = (lines[:, 2], lines[:, 3])
+        # Lado de cada línea: a·x + b·y + c > 0
+        self._a = lines[:, 3] - lines[:, 1]
+        self._b = lines[:, 0] - lines[:, 2]
+        self._c = lines[:, 2] * lines[:, 1] - lines[:, 0] * lines[:, 3]
+        self._count_first = np.array([c.count_first_crossing for c in counters], dtype=bool)
+        anchor_columns: Dict[Any, List[int]] = {}
+        for index, counter in enumerate(counters):
+            anchor_columns.setdefault(counter.anchor_point, []).append(index)
+        self._anchor_columns = {anchor: np.array(columns) for anchor, columns in anchor_columns.items()}
+
+        self._reset_state()
+
+    def _reset_state(self):
+        # track_id -> fila de las matrices; al desalojar un track su fila queda libre para reutilizarse
+        self._rows = TrackStateStore(on_evict=self._release_row)
+        self._free_rows: List[int] = []
+        self._last_side = np.full((self.INITIAL_CAPACITY, len(self.counters)), UNKNOWN_SIDE, dtype=np.int8)
+        self._counted = np.zeros((self.INITIAL_CAPACITY, len(self.counters)), dtype=bool)
+
+    def _row_for(self, tid: int) -> int:
+        row = self._rows.get(tid)
+        if row is None:
+            if self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                row = len(self._rows)
+                if row >= len(self._last_side):
+                    extra = len(self._last_side)
+                    self._last_side = np.vstack((self._last_side, np.full_like(self._last_side[:extra], UNKNOWN_SIDE)))
+                    self._counted = np.vstack((self._counted, np.zeros_like(self._counted[:extra])))
+            self._last_side[row] = UNKNOWN_SIDE
+            self._counted[row] = False
+            self._rows[tid] = row
+        return row
+
+    def _release_row(self, tid: int, row: int):
+        self._free_rows.append(row)
+
+    def stats(self) -> Dict[str, Any]:
+        """Tamaño del estado por track (tracks vivos y filas reservadas) para los logs."""
+        return {**self._rows.stats(), "capacity": len(self._last_side)}
+
+    def _class_mask(self, tids: List[int], tid_to_class: Dict[int, str]) -> np.ndarray:
+        """(T, L): el track pasa el filtro `class_list` de cada línea."""
+        classes = [tid_to_class.get(tid) for tid in tids]
+        vocabulary = {name: i for i, name in enumerate(dict.fromkeys(classes))}
+        codes = np.array([vocabulary[name] for name in classes], dtype=np.int64)
+        allowed = np.array([
+            [not c.class_list or name in c.class_list for c in self.counters]
+            for name in vocabulary
+        ], dtype=bool).reshape(len(vocabulary), len(self.counters))
+        return allowed[codes]
+
+    def analyze(self, result: Any):
+        if not self.counters:
+            return
+        if not hasattr(result, "trails") or not result.trails:
+            self._reset_state()
+            return
+
+        trails = [(tid, trail) for tid, trail in result.trails.items() if trail is not None and len(trail) > 0]
+        if not trails:
+            return
+
+        tids = [tid for tid, _ in trails]
+        lengths = np.array([len(trail) for _, trail in trails])
+        current = np.array([trail[-1] for _, trail in trails], dtype=np.float64).reshape(-1, 4)
+        previous = np.array([trail[-2] if len(trail) > 1 else trail[-1] for _, trail in trails], dtype=np.float64).reshape(-1, 4)
+        rows = np.array([self._row_for(tid) for tid in tids], dtype=np.int64)
+
+        tid_to_class = DetectionBatch.of(result).track_classes()
+        eligible = self._class_mask(tids, tid_to_class)
+
+        # Puntos de anclaje (T, L) según el anchor_point de cada línea
+        shape = (len(tids), len(self.counters))
+        cur_x, cur_y = np.empty(shape), np.empty(shape)
+        prev_x, prev_y = np.empty(shape), np.empty(shape)
+        for anchor_type, columns in self._anchor_columns.items():
+            cur_points = bbox_anchor_points(current, anchor_type)
+            prev_points = bbox_anchor_points(previous, anchor_type)
+            cur_x[:, columns] = cur_points[:, 0:1]
+            cur_y[:, columns] = cur_points[:, 1:2]
+            prev_x[:, columns] = prev_points[:, 0:1]
+            prev_y[:, columns] = prev_points[:, 1:2]
+
+        current_side = (self._a * cur_x + self._b * cur_y + self._c > 0).astype(np.int8)
+        last_side = self._last_side[rows]
+        counted = self._counted[rows]
+        known = last_side != UNKNOWN_SIDE
+        moving = (lengths > 1)[:, None]
+
+        initialize = eligible & ~known
+        update = eligible & known & moving
+        crossing = (
+            update
+            & (last_side != current_side)
+            & ~counted
+            & segments_intersect(self._p1, self._q1, (prev_x, prev_y), (cur_x, cur_y))
+        )
+
+        new_last_side = np.where(initialize | update, current_side, last_side)
+        new_counted = np.where(crossing, self._count_first[None, :], counted)
+        self._last_side[rows] = new_last_side
+        self._counted[rows] = new_counted
+
+        # Los tracks que salieron del tracker liberan su fila
+        self._rows.retain(result.trails)
+
+        # Solo los cruces confirmados pasan por Python (en orden de línea, como antes)
+        for line_index, track_index in zip(*np.nonzero(crossing.T)):
+            tid = tids[track_index]
+            self.counters[line_index].register_crossing(
+                tid,
+                bool(last_side[track_index, line_index]),
+                bool(current_side[track_index, line_index]),
+                tid_to_class.get(tid, "Unknown"),
+            )
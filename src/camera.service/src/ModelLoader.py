@@ -1,6 +1,11 @@
 from pathlib import Path # Necesario para manejar rutas de archivos
-import sys
+import json
+import time
+import threading
+import weakref
 import logging # Asumiendo que usas logging, si no, puedes usar print o configurar uno básico
+import psutil
+from typing import Any, Dict
 
 # CAMBIO: Usar degirum._zoo_accessor como se proporcionó
 import degirum._zoo_accessor as zoo
@@ -10,7 +15,35 @@ logger = logging.getLogger(__name__)
 if not logger.handlers:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+def _rss_bytes() -> int:
+    return psutil.Process().memory_info().rss
+
+
+class ModelLoadError(RuntimeError):
+    """El modelo no existe o no se pudo cargar."""
+
+
 class ModelLoader:
+    """
+    Cargador de modelos HailoRT con un registro global por proceso.
+
+    Cada modelo se carga una sola vez por proceso y se reutiliza en todas las
+    instancias que lo pidan por nombre. `lazy_model()` devuelve un proxy que
+    difiere la carga hasta la primera inferencia; `evict()` libera un modelo del
+    registro (se vuelve a cargar si se usa de nuevo).
+
+    Los errores se reportan con `ModelLoadError` (nunca `sys.exit`, que en un hilo
+    de inferencia solo terminaría ese hilo). `lazy_model()` valida los archivos del
+    modelo al registrarlo, de modo que un modelo ausente o corrupto detiene el
+    servicio al arrancar; si aun así la carga diferida falla, el error se recuerda
+    y se relanza sin reintentar en cada inferencia hasta un `evict()`.
+    """
+
+    _registry: Dict[str, Any] = {}
+    _load_stats: Dict[str, Dict[str, float]] = {}
+    _failures: Dict[str, ModelLoadError] = {}
+    _registry_lock = threading.RLock()
+
     # CAMBIO: El constructor ahora recibe solo el nombre del modelo
     def __init__(self, model_name: str):
         """
@@ -23,7 +56,7 @@ class ModelLoader:
 
         if not self.model_name:
             logger.critical("El nombre del modelo no puede estar vacío.")
-            sys.exit(1)
+            raise ModelLoadError("El nombre del modelo no puede estar vacío.")
 
         # Configuración del dispositivo Hailo (puede ser fija o leerse de la config global si aplica)
         self.device_type = ['HAILORT/HAILO8L'] 
@@ -36,35 +69,135 @@ class ModelLoader:
 
     def load_model(self):
         """
-        Carga el modelo HailoRT especificado en el constructor.
+        Retorna el modelo HailoRT especificado en el constructor, cargándolo
+        solo si aún no está en el registro del proceso.
 
         Returns:
             object: El objeto del modelo cargado de HailoRT.
+
+        Raises:
+            ModelLoadError: si el modelo no existe o falló su carga.
         """
+        cached = ModelLoader._registry.get(self.model_name)
+        if cached is not None:
+            self.loaded_model = cached
+            return cached
+
+        with ModelLoader._registry_lock:
+            # Otro hilo pudo haberlo cargado mientras esperábamos el lock
+            cached = ModelLoader._registry.get(self.model_name)
+            if cached is not None:
+                self.loaded_model = cached
+                return cached
+
+            failure = ModelLoader._failures.get(self.model_name)
+            if failure is not None:
+                raise failure
+
+            rss_before = _rss_bytes()
+            started_at = time.perf_counter()
+            try:
+                self._load_from_zoo()
+            except ModelLoadError as e:
+                ModelLoader._failures[self.model_name] = e
+                raise
+            load_seconds = time.perf_counter() - started_at
+            rss_delta = _rss_bytes() - rss_before
+
+            ModelLoader._registry[self.model_name] = self.loaded_model
+            ModelLoader._load_stats[self.model_name] = {
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_mb": round(rss_delta / (1024 * 1024), 2),
+                "loaded_at": time.time(),
+            }
+            logger.info(
+                f"Modelo '{self.model_name}' cargado con éxito en {load_seconds:.2f}s "
+                f"(RSS {rss_delta / (1024 * 1024):+.1f} MB)."
+            )
+
+        return self.loaded_model
+
+    def validate(self):
+        """
+        Comprueba sin cargarlo que el JSON del modelo existe, es legible y que
+        existen los archivos que referencia (`ModelPath`).
+
+        Raises:
+            ModelLoadError: si falta algún archivo o el JSON está corrupto.
+        """
+        if not self.model_path.exists():
+            raise ModelLoadError(f"No se encontró el archivo del modelo: {self.model_path}")
+        try:
+            with open(self.model_path, 'r') as f:
+                model_config = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ModelLoadError(f"Configuración del modelo '{self.model_name}' ilegible: {e}") from e
+
+        parameters = model_config.get('MODEL_PARAMETERS') if isinstance(model_config, dict) else None
+        for entry in parameters or []:
+            model_file = entry.get('ModelPath') if isinstance(entry, dict) else None
+            if model_file and not (self.model_path.parent / model_file).exists():
+                raise ModelLoadError(
+                    f"Falta el archivo '{model_file}' del modelo '{self.model_name}' en {self.model_path.parent}"
+                )
+
+    def _load_from_zoo(self):
         try:
             # --- Cargar el Modelo ---
-            if not self.model_path.exists():
-                raise FileNotFoundError(f"No se encontró el archivo del modelo: {self.model_path}")
-            
+            self.validate()
+
             # Usar self.model_path y self.model_name
             accessor = zoo._LocalInferenceSingleFileZooAccessor(str(self.model_path))
             self.loaded_model = accessor.load_model(self.model_name)
             self.loaded_model.device_type = self.device_type
             self.loaded_model.inference_host_address = self.inference_host_address
             self.loaded_model.measure_time = True # Asumiendo que esta propiedad existe y es relevante
-            logger.info(f"Modelo '{self.model_name}' cargado con éxito.")
 
-        except FileNotFoundError as fnfe:
-            logger.critical(f"ERROR: Archivo de modelo no encontrado: {fnfe}")
-            sys.exit(1)
+        except ModelLoadError as mle:
+            logger.critical(f"ERROR: {mle}")
+            raise
         except DegirumException as de: # Usar excepción específica si es relevante
             logger.critical(f"ERROR: Fallo específico de Degirum/HailoRT al cargar el modelo '{self.model_name}': {de}", exc_info=True)
-            sys.exit(1)
+            raise ModelLoadError(f"Fallo de Degirum/HailoRT al cargar el modelo '{self.model_name}': {de}") from de
         except Exception as e:
             logger.critical(f"ERROR: No se pudo cargar el modelo '{self.model_name}': {e}", exc_info=True)
-            sys.exit(1)
-        
-        return self.loaded_model
+            raise ModelLoadError(f"No se pudo cargar el modelo '{self.model_name}': {e}") from e
+
+    def lazy_model(self) -> "LazyModel":
+        """
+        Retorna un proxy que carga el modelo (vía el registro) en su primer uso.
+        Los archivos se validan ya, para que un modelo ausente falle al arrancar.
+        """
+        if not ModelLoader.is_loaded(self.model_name):
+            try:
+                self.validate()
+            except ModelLoadError as e:
+                logger.critical(f"ERROR: {e}")
+                raise
+        return LazyModel(self.model_name)
+
+    @classmethod
+    def evict(cls, model_name: str) -> bool:
+        """Quita un modelo del registro. Retorna True si estaba cargado."""
+        with cls._registry_lock:
+            model = cls._registry.pop(model_name, None)
+            cls._load_stats.pop(model_name, None)
+            # Permite reintentar la carga de un modelo que había fallado
+            cls._failures.pop(model_name, None)
+        if model is None:
+            return False
+        logger.info(f"Modelo '{model_name}' liberado del registro.")
+        return True
+
+    @classmethod
+    def is_loaded(cls, model_name: str) -> bool:
+        return model_name in cls._registry
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, float]]:
+        """Tiempo de carga y memoria (delta de RSS) por modelo cargado."""
+        with cls._registry_lock:
+            return {name: dict(values) for name, values in cls._load_stats.items()}
     
 
     def inference(self, frame):
@@ -105,5 +238,51 @@ class ModelLoader:
 
         return detections
 
-                
-                
\ No newline at end of file
+
+class LazyModel:
+    """
+    Proxy de un modelo del registro de `ModelLoader`.
+
+    No carga nada al construirse; la primera inferencia (o el primer acceso a un
+    atributo del modelo) lo carga a través de `ModelLoader.load_model()`. Como el
+    proxy no retiene el modelo, `ModelLoader.evict()` lo libera realmente y el
+    siguiente uso lo vuelve a cargar.
+
+    Los atributos asignados en el proxy (p. ej. `output_confidence_threshold`) se
+    guardan en él y se vuelven a aplicar a cada instancia cargada, así no se
+    pierden cuando el modelo se recarga tras un `evict()`. Para saber si la
+    instancia actual ya los recibió se guarda solo una referencia débil.
+    """
+
+    def __init__(self, model_name: str):
+        object.__setattr__(self, "model_name", model_name)
+        object.__setattr__(self, "_settings", {})
+        object.__setattr__(self, "_configured", lambda: None)
+
+    @property
+    def model(self):
+        model = ModelLoader(self.model_name).load_model()
+        if model is not self._configured():
+            for name, value in self._settings.items():
+                setattr(model, name, value)
+            object.__setattr__(self, "_configured", weakref.ref(model))
+        return model
+
+    def __call__(self, *args, **kwargs):
+        return self.model(*args, **kwargs)
+
+    def predict_batch(self, data):
+        return self.model.predict_batch(data)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def __setattr__(self, name, value):
+        self._settings[name] = value
+        # Si aún no está cargado, se aplica en la primera carga
+        if ModelLoader.is_loaded(self.model_name):
+            setattr(self.model, name, value)
+
+    def __repr__(self):
+        state = "cargado" if ModelLoader.is_loaded(self.model_name) else "diferido"
+        return f"LazyModel({self.model_name!r}, {state})"
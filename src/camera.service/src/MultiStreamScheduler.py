@@ -0,0 +1,215 @@
+import time
+import traceback
+import numpy as np
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from src.EventProcessor import EventProcessor
+from src.FrameProcessor import FrameProcessor
+from src.GstPipeline import uses_gstreamer
+from src.SharedFrameRing import SharedFrameRing
+from src.StreamCapture import CAPTURE_CONTEXT, StreamCapture
+from src.utils import LetterboxPlan
+
+
+class _StreamSlot:
+    """Estado por cámara dentro del planificador."""
+
+    def __init__(self, stream: Dict[str, Any], ring: SharedFrameRing):
+        self.stream = stream
+        self.processor: Optional[FrameProcessor] = None
+        self.ring = ring
+        self.capture: Optional[StreamCapture] = None
+        # Recorte/letterbox precalculado; se reconstruye si cambia la resolución del stream
+        self.letterbox: Optional[LetterboxPlan] = None
+        self.last_seq = 0
+        self.restart_at = 0.0
+
+
+class MultiStreamScheduler:
+    """
+    Aloja todas las cámaras de `config['streams']` en un único proceso.
+
+    Los modelos de detección y de atributos faciales se cargan una sola vez y se
+    comparten entre los `FrameProcessor` de cada cámara. Un planificador round-robin
+    intercala los frames de todas las cámaras en un único pipeline `predict_batch`,
+    y cada resultado se despacha al procesador de su cámara.
+    """
+
+    RESTART_DELAY_SECONDS = 10
+    IDLE_WAIT_SECONDS = 0.5
+    # Buffers de letterbox reutilizables por cámara; si hay más frames en vuelo se asignan aparte
+    FRAMES_IN_FLIGHT_PER_STREAM = 4
+    MODEL_INPUT_SIZE = (640, 640)
+
+    def __init__(self, config: Dict[str, Any], streams: List[Dict[str, Any]],
+                 on_frame: Optional[Callable[[Dict[str, Any], np.ndarray], None]] = None):
+        if not streams:
+            raise ValueError("No hay streams configurados para el modo multi-stream.")
+
+        self.config = config
+        self.on_frame = on_frame
+        self.stop_event = CAPTURE_CONTEXT.Event()
+        self.new_frame_event = CAPTURE_CONTEXT.Event()
+        self._cursor = 0
+        self.combined_model = None
+        self.face_feature_model = None
+
+        self.slots: List[_StreamSlot] = []
+        for stream in streams:
+            frame_w, frame_h = self.MODEL_INPUT_SIZE if uses_gstreamer(stream) else stream['input'].get('size', [1920, 1080])
+            ring = SharedFrameRing(
+                slots=4, max_shape=(frame_h, frame_w, 3), new_frame_event=self.new_frame_event
+            )
+            self.slots.append(_StreamSlot(stream, ring))
+
+    def _load_processors(self):
+        print(f"[DEBUG_INIT] Preparando modelos compartidos para {len(self.slots)} streams...")
+        self.combined_model = FrameProcessor.load_detection_model()
+        self.face_feature_model = EventProcessor.load_face_feature_model()
+
+        for slot in self.slots:
+            slot.processor = FrameProcessor(
+                self.config, slot.stream,
+                combined_model=self.combined_model,
+                face_feature_model=self.face_feature_model,
+            )
+
+        print(f"[✔] MultiStreamScheduler inicializado con {len(self.slots)} streams")
+
+    def _log(self, message: str):
+        print(f"[{datetime.now()}] [MultiStreamScheduler] {message}")
+
+    # ------------------------------------------------------------------
+    # Captura
+    # ------------------------------------------------------------------
+
+    def _start_capture(self, slot: _StreamSlot):
+        slot.ring.set_status(SharedFrameRing.STATUS_RUNNING)
+        slot.capture = StreamCapture(
+            slot.stream['input']['url'],
+            self.stop_event,
+            slot.ring,
+            slot.stream['input'].get('fps', 0),
+            stream=slot.stream,
+            target_size=self.MODEL_INPUT_SIZE,
+        )
+        slot.capture.start()
+        self._log(f"Captura iniciada para stream {slot.stream.get('id')}")
+
+    def _supervise_captures(self):
+        """Reinicia (con retardo) las capturas que terminaron; una cámara caída no detiene al resto."""
+        now = time.monotonic()
+        for slot in self.slots:
+            if slot.capture is None or slot.capture.is_alive():
+                continue
+            if slot.restart_at == 0.0:
+                self._log(f"Captura del stream {slot.stream.get('id')} terminó (exit_code={slot.capture.exitcode}). "
+                          f"Reintentando en {self.RESTART_DELAY_SECONDS}s.")
+                slot.restart_at = now + self.RESTART_DELAY_SECONDS
+            elif now >= slot.restart_at:
+                slot.restart_at = 0.0
+                self._start_capture(slot)
+
+    # ------------------------------------------------------------------
+    # Planificación
+    # ------------------------------------------------------------------
+
+    def _next_frame(self):
+        """
+        Recorre las cámaras en orden round-robin a partir de la última servida y
+        devuelve el primer frame nuevo que encuentre, junto con el plan de letterbox
+        al que hay que devolver su buffer (None si el frame no salió de un plan).
+
+        No se limita a un frame en vuelo por cámara: el generador corre en el mismo
+        hilo que `predict_batch`, así que esperar aquí a que llegue un resultado
+        bloquearía el pipeline. La cola interna del modelo acota los frames en vuelo.
+        """
+        count = len(self.slots)
+        for offset in range(count):
+            index = (self._cursor + offset) % count
+            slot = self.slots[index]
+            seq, frame = slot.ring.read_latest(slot.last_seq)
+            if frame is None:
+                continue
+
+            slot.last_seq = seq
+            plan = None
+            if uses_gstreamer(slot.stream):
+                # GstPipeline ya recortó el ROI y aplicó el letterbox: solo se copia fuera del anillo
+                roi_frame = frame.copy()
+            else:
+                if slot.letterbox is None or not slot.letterbox.matches(frame):
+                    slot.letterbox = LetterboxPlan(
+                        frame.shape, slot.stream.get('roi', None), self.MODEL_INPUT_SIZE,
+                        pool_size=self.FRAMES_IN_FLIGHT_PER_STREAM,
+                    )
+                # Puede haber varios frames de esta cámara en vuelo: cada uno usa su propio
+                # buffer del pool, que vuelve al plan cuando se procesa el resultado
+                plan = slot.letterbox
+                roi_frame = plan.apply(frame, out=plan.acquire())
+            slot.ring.release()
+
+            self._cursor = (index + 1) % count
+            return slot, roi_frame, plan
+        return None, None, None
+
+    def _frames(self):
+        while not self.stop_event.is_set():
+            self._supervise_captures()
+
+            self.new_frame_event.clear()
+            slot, frame, plan = self._next_frame()
+            if frame is None:
+                self.new_frame_event.wait(self.IDLE_WAIT_SECONDS)
+                continue
+
+            yield frame, (slot, frame, plan, time.perf_counter())
+
+    # ------------------------------------------------------------------
+
+    def run(self):
+        # Las capturas usan `spawn`, así que no heredan el estado del runtime de HailoRT
+        # ni ahora ni cuando `_supervise_captures` las reinicia con los modelos ya cargados.
+        for slot in self.slots:
+            self._start_capture(slot)
+
+        try:
+            self._load_processors()
+            waiting_since = time.perf_counter()
+            for result in self.combined_model.predict_batch(self._frames()):
+                slot, buffer, plan, submitted_at = result.info
+                try:
+                    frame = slot.processor.handle_result(result, buffer, submitted_at, waiting_since)
+                    slot.ring.mark_processed()
+                    if self.on_frame is not None:
+                        self.on_frame(slot.stream, frame)
+                except Exception as e:
+                    self._log(f"!!! ERROR procesando frame del stream {slot.stream.get('id')}: {e}")
+                    print(traceback.format_exc())
+                finally:
+                    if plan is not None:
+                        plan.release(buffer)
+                waiting_since = time.perf_counter()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        self.new_frame_event.set()
+        for slot in self.slots:
+            if slot.capture is not None:
+                slot.capture.join(timeout=5)
+                if slot.capture.is_alive():
+                    self._log(f"Advertencia: la captura del stream {slot.stream.get('id')} no se cerró a tiempo. Terminando forzosamente.")
+                    slot.capture.terminate()
+                    slot.capture.join()
+            slot.ring.close()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            slot.stream.get('id'): {
+                "frames": slot.ring.stats(),
+                "latency": slot.processor.latency.report() if slot.processor else {},
+            }
+            for slot in self.slots
+        }
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import aiohttp
+from datetime import datetime
+from typing import Optional
+
+
+class PreviewPublisher:
+    """
+    Canal persistente (WebSocket) hacia el BFF para los frames de vista previa.
+
+    `publish(frame_bytes)` no bloquea: deja el frame en un único slot y vuelve de
+    inmediato (el último gana). Una tarea en segundo plano mantiene la conexión con
+    `ws://<host>/ingest/<stream_id>`, envía el frame más reciente cuando el canal
+    queda libre y se reconecta con backoff si el BFF no está disponible. Un BFF
+    lento solo provoca frames de vista previa descartados, nunca retrasa la
+    inferencia.
+
+    El BFF informa por el mismo canal cuántos espectadores hay (`{"viewers": n}`);
+    `active` indica si vale la pena codificar frames de vista previa.
+    """
+
+    RECONNECT_MIN_SECONDS = 1.0
+    RECONNECT_MAX_SECONDS = 30.0
+    HEARTBEAT_SECONDS = 20.0
+
+    def __init__(self, stream_id: str, base_url: str = "ws://127.0.0.1:8000"):
+        self.stream_id = stream_id
+        self.url = f"{base_url}/ingest/{stream_id}"
+        self._latest: Optional[bytes] = None
+        self._pending = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.viewers = 0
+        self.sent = 0
+        self.dropped = 0
+
+    def _log(self, message: str):
+        print(f"[{datetime.now()}] [PreviewPublisher] {message}")
+
+    @property
+    def active(self) -> bool:
+        return self.viewers > 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def publish(self, frame_bytes: bytes):
+        if self._latest is not None:
+            # El frame anterior aún no salió: se reemplaza por el más nuevo
+            self.dropped += 1
+        self._latest = frame_bytes
+        self._pending.set()
+
+    async def _run(self):
+        delay = self.RECONNECT_MIN_SECONDS
+        async with aiohttp.ClientSession() as session:
+            while True:
+                try:
+                    async with session.ws_connect(self.url, heartbeat=self.HEARTBEAT_SECONDS) as ws:
+                        self._log(f"Conectado a {self.url}")
+                        delay = self.RECONNECT_MIN_SECONDS
+                        await self._serve(ws)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self._log(f"Conexión con {self.url} no disponible ({e}). Reintentando en {delay:.0f}s.")
+                finally:
+                    # Sin conexión no hay espectadores: se deja de codificar
+                    self.viewers = 0
+                    self._latest = None
+                await asyncio.sleep(delay)
+                delay = min(self.RECONNECT_MAX_SECONDS, delay * 2)
+
+    async def _serve(self, ws):
+        tasks = [asyncio.create_task(self._send_loop(ws)), asyncio.create_task(self._receive_loop(ws))]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _receive_loop(self, ws):
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                continue
+            try:
+                viewers = int(json.loads(msg.data).get("viewers", 0))
+            except (ValueError, AttributeError):
+                continue
+            if viewers != self.viewers:
+                self._log(f"Espectadores de {self.stream_id}: {viewers}")
+            self.viewers = viewers
+        self._log(f"El BFF cerró la conexión {self.url}")
+
+    async def _send_loop(self, ws):
+        while not ws.closed:
+            await self._pending.wait()
+            self._pending.clear()
+            frame_bytes, self._latest = self._latest, None
+            if frame_bytes is None:
+                continue
+            await ws.send_bytes(frame_bytes)
+            self.sent += 1
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
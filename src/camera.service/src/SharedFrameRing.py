@@ -0,0 +1,264 @@
+import os
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+# --- Layout de la cabecera (int64) ---
+_HDR_LATEST_SEQ = 0     # Secuencia del último frame publicado (0 = ninguno)
+_HDR_LATEST_SLOT = 1    # Slot que contiene el último frame
+_HDR_READER_SLOT = 2    # Slot "anclado" por el consumidor (-1 = ninguno)
+_HDR_STATUS = 3         # Estado del productor (ver STATUS_*)
+_HDR_DROPPED = 4        # Frames sobrescritos sin llegar a ser leídos
+_HDR_PROCESSED = 5      # Frames marcados como procesados por el consumidor
+_HDR_LAST_READ = 6      # Última secuencia entregada al consumidor
+_HDR_FIELDS = 8         # Campos reservados de la cabecera
+
+# --- Metadatos por slot (int64): seq, alto, ancho, canales ---
+_META_SEQ = 0
+_META_FIELDS = 4
+
+_DATA_ALIGN = 64
+
+
+class SharedFrameRing:
+    """
+    Anillo de frames de tamaño fijo sobre `multiprocessing.shared_memory`.
+
+    El productor (StreamCapture) copia cada frame decodificado en un slot libre y
+    publica su número de secuencia; el consumidor lee el frame más reciente
+    directamente desde la memoria compartida, sin serialización ni pipes.
+
+    El consumidor "ancla" el slot que está leyendo y el productor nunca escribe
+    sobre ese slot, por lo que la vista devuelta por `read_latest` es válida hasta
+    la siguiente lectura o hasta `release()`.
+
+    Modo "último frame": el consumidor espera con `wait_latest` (bloqueando en un
+    evento, sin sondeo) hasta que exista un frame más nuevo que el último leído.
+    Los frames que el productor publica mientras el consumidor está ocupado se
+    contabilizan como descartados; `stats()` expone los contadores por stream.
+
+    El anillo se crea en el proceso padre; el subproceso de captura (iniciado con
+    `spawn`) lo recibe serializado y vuelve a mapear la memoria compartida por nombre.
+    """
+
+    STATUS_RUNNING = 0
+    STATUS_ERROR = 1
+    STATUS_STOPPED = 2
+
+    MIN_SLOTS = 3
+
+    def __init__(self, slots: int = 4, max_shape: Tuple[int, int, int] = (1080, 1920, 3), new_frame_event=None):
+        """
+        `new_frame_event` permite que varios anillos compartan el mismo evento de
+        "frame nuevo", de modo que un único consumidor espere a cualquiera de ellos.
+        """
+        if slots < self.MIN_SLOTS:
+            raise ValueError(f"SharedFrameRing necesita al menos {self.MIN_SLOTS} slots (recibido: {slots}).")
+
+        self.slots = slots
+        self.max_shape = tuple(max_shape)
+        self.slot_bytes = int(np.prod(self.max_shape))
+
+        header_bytes = (_HDR_FIELDS + _META_FIELDS * slots) * np.dtype(np.int64).itemsize
+        self._data_offset = -(-header_bytes // _DATA_ALIGN) * _DATA_ALIGN
+        total_bytes = self._data_offset + self.slot_bytes * slots
+
+        self._shm = shared_memory.SharedMemory(create=True, size=total_bytes)
+        self._owner_pid = os.getpid()
+        self._new_frame = new_frame_event if new_frame_event is not None else mp.get_context("spawn").Event()
+        self._map_buffers()
+
+        self._header[:] = 0
+        self._header[_HDR_READER_SLOT] = -1
+        self._header[_HDR_LATEST_SLOT] = -1
+        self._meta[:] = 0
+
+    def _map_buffers(self):
+        buf = self._shm.buf
+        self._header = np.ndarray((_HDR_FIELDS,), dtype=np.int64, buffer=buf, offset=0)
+        self._meta = np.ndarray(
+            (self.slots, _META_FIELDS), dtype=np.int64, buffer=buf,
+            offset=_HDR_FIELDS * np.dtype(np.int64).itemsize
+        )
+        self._data = np.ndarray(
+            (self.slots, self.slot_bytes), dtype=np.uint8, buffer=buf, offset=self._data_offset
+        )
+
+    def __getstate__(self):
+        # Solo viaja el nombre del segmento: el receptor lo vuelve a mapear (sin ser dueño)
+        return {
+            "slots": self.slots, "max_shape": self.max_shape, "slot_bytes": self.slot_bytes,
+            "data_offset": self._data_offset, "name": self._shm.name, "new_frame": self._new_frame,
+        }
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.max_shape = state["max_shape"]
+        self.slot_bytes = state["slot_bytes"]
+        self._data_offset = state["data_offset"]
+        self._new_frame = state["new_frame"]
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner_pid = None
+        self._map_buffers()
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    # ------------------------------------------------------------------
+    # Productor
+    # ------------------------------------------------------------------
+
+    def write(self, frame: np.ndarray) -> int:
+        """
+        Copia `frame` en un slot libre y lo publica como el más reciente.
+        Retorna el número de secuencia asignado.
+        """
+        if frame.dtype != np.uint8:
+            raise ValueError(f"SharedFrameRing solo admite frames uint8 (recibido: {frame.dtype}).")
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(
+                f"Frame de {frame.shape} excede la capacidad del slot {self.max_shape}."
+            )
+
+        h, w = frame.shape[:2]
+        c = frame.shape[2] if frame.ndim == 3 else 1
+
+        slot = self._acquire_write_slot()
+        meta = self._meta[slot]
+        meta[1] = h
+        meta[2] = w
+        meta[3] = c
+        np.copyto(self._slot_view(slot, h, w, c), frame.reshape(h, w, c))
+
+        seq = int(self._header[_HDR_LATEST_SEQ]) + 1
+        meta[_META_SEQ] = seq
+        self._header[_HDR_LATEST_SLOT] = slot
+        self._header[_HDR_LATEST_SEQ] = seq
+        self._new_frame.set()
+        return seq
+
+    def _acquire_write_slot(self) -> int:
+        latest = int(self._header[_HDR_LATEST_SLOT])
+        candidate = (latest + 1) % self.slots
+        for _ in range(self.slots):
+            if candidate != latest and candidate != self._header[_HDR_READER_SLOT]:
+                previous_seq = int(self._meta[candidate, _META_SEQ])
+                # Marcar el slot "en escritura" y confirmar que el consumidor no lo ancló
+                # entre la elección y la marca. Si lo hizo, se restaura y se prueba otro.
+                self._meta[candidate, _META_SEQ] = -1
+                if candidate != self._header[_HDR_READER_SLOT]:
+                    return candidate
+                self._meta[candidate, _META_SEQ] = previous_seq
+            candidate = (candidate + 1) % self.slots
+        raise RuntimeError("SharedFrameRing: no hay slots libres para escribir.")
+
+    def set_status(self, status: int):
+        self._header[_HDR_STATUS] = status
+        # Despierta al consumidor para que observe el cambio de estado
+        self._new_frame.set()
+
+    # ------------------------------------------------------------------
+    # Consumidor
+    # ------------------------------------------------------------------
+
+    @property
+    def status(self) -> int:
+        return int(self._header[_HDR_STATUS])
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self._header[_HDR_LATEST_SEQ])
+
+    def read_latest(self, after_seq: int = 0, retries: int = 8) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Retorna `(seq, frame)` con el frame más reciente si su secuencia es mayor
+        que `after_seq`; en otro caso `(after_seq, None)`.
+
+        `frame` es una vista sobre la memoria compartida (sin copia). El slot queda
+        anclado hasta la próxima lectura o hasta `release()`.
+        """
+        for _ in range(retries):
+            seq = int(self._header[_HDR_LATEST_SEQ])
+            if seq <= after_seq:
+                return after_seq, None
+
+            slot = int(self._header[_HDR_LATEST_SLOT])
+            if slot < 0:
+                return after_seq, None
+
+            self._header[_HDR_READER_SLOT] = slot
+            meta = self._meta[slot]
+            if meta[_META_SEQ] != seq:
+                # El productor avanzó entre la lectura de la cabecera y el anclaje.
+                continue
+
+            h, w, c = int(meta[1]), int(meta[2]), int(meta[3])
+            view = self._slot_view(slot, h, w, c)
+
+            last_read = int(self._header[_HDR_LAST_READ])
+            if seq > last_read + 1:
+                self._header[_HDR_DROPPED] += seq - last_read - 1
+            self._header[_HDR_LAST_READ] = seq
+            return seq, (view if c > 1 else view[:, :, 0])
+
+        self.release()
+        return after_seq, None
+
+    def wait_latest(self, after_seq: int = 0, timeout: Optional[float] = None) -> Tuple[int, Optional[np.ndarray]]:
+        """
+        Igual que `read_latest`, pero bloquea hasta que haya un frame más nuevo que
+        `after_seq`, el productor cambie de estado o venza `timeout`.
+        """
+        seq, frame = self.read_latest(after_seq)
+        if frame is not None:
+            return seq, frame
+
+        self._new_frame.clear()
+        # Releer tras limpiar el evento: un frame publicado entre la primera
+        # lectura y el clear() no debe quedar esperando hasta el siguiente.
+        seq, frame = self.read_latest(after_seq)
+        if frame is not None:
+            return seq, frame
+
+        self._new_frame.wait(timeout)
+        return self.read_latest(after_seq)
+
+    def mark_processed(self):
+        """Registra que el consumidor terminó de procesar el frame leído."""
+        self._header[_HDR_PROCESSED] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Contadores del stream: capturados, descartados, procesados y retraso actual."""
+        captured = int(self._header[_HDR_LATEST_SEQ])
+        return {
+            "captured": captured,
+            "dropped": int(self._header[_HDR_DROPPED]),
+            "processed": int(self._header[_HDR_PROCESSED]),
+            "lag": captured - int(self._header[_HDR_LAST_READ]),
+        }
+
+    def release(self):
+        """Libera el slot anclado por el consumidor."""
+        self._header[_HDR_READER_SLOT] = -1
+
+    # ------------------------------------------------------------------
+
+    def _slot_view(self, slot: int, h: int, w: int, c: int) -> np.ndarray:
+        return self._data[slot, :h * w * c].reshape(h, w, c)
+
+    def close(self):
+        """Cierra el mapeo local y, si este proceso creó el anillo, lo elimina."""
+        self._header = self._meta = self._data = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # Aún hay vistas de frames vivas; el mapeo se libera al recolectarlas.
+            pass
+        if self._owner_pid == os.getpid():
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._owner_pid = None
@@ -0,0 +1,37 @@
+from collections import deque
+from typing import Dict
+
+
+class StageLatency:
+    """
+    Acumula latencias por etapa (en segundos) sobre una ventana móvil y las
+    reporta en milisegundos.
+    """
+
+    def __init__(self, window: int = 100):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+
+    def add(self, stage: str, seconds: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        report = {}
+        for stage, samples in self._samples.items():
+            if not samples:
+                continue
+            report[stage] = {
+                "avg_ms": round(1000 * sum(samples) / len(samples), 2),
+                "max_ms": round(1000 * max(samples), 2),
+            }
+        return report
+
+    def format(self) -> str:
+        return " | ".join(
+            f"{stage}: {values['avg_ms']:.1f}ms (máx {values['max_ms']:.1f}ms)"
+            for stage, values in self.report().items()
+        )
+
@@ -0,0 +1,141 @@
+import multiprocessing as mp
+import time
+import cv2
+from datetime import datetime
+from typing import Any, Dict, Optional
+from src.GstPipeline import GstPipeline, uses_gstreamer
+from src.SharedFrameRing import SharedFrameRing
+
+# Las capturas se inician con `spawn`: el subproceso arranca limpio aunque el padre
+# ya haya cargado los modelos (y el runtime de HailoRT), p. ej. al reiniciar una cámara.
+# Los eventos que se le pasan deben crearse con este mismo contexto.
+CAPTURE_CONTEXT = mp.get_context("spawn")
+
+
+class StreamCapture(CAPTURE_CONTEXT.Process):
+    """
+    Subproceso de captura: decodifica el stream y publica cada frame en un
+    `SharedFrameRing`. Por defecto decodifica con OpenCV; si `stream['input']['backend']`
+    es `"gstreamer"` usa `GstPipeline`, que entrega frames ya recortados al ROI y
+    redimensionados a `target_size` dentro del pipeline. Reintenta la conexión internamente y, si el stream
+    falla de forma persistente (o por un error de configuración que reconectar no
+    corrige), marca el anillo con STATUS_ERROR y termina con código 1 para que
+    systemd reinicie el servicio.
+    """
+
+    RECONNECT_DELAY_SECONDS = 5
+    MAX_RECONNECT_ATTEMPTS = 12
+
+    def __init__(self, link: str, stop_event, frame_ring: SharedFrameRing, framerate: float,
+                 stream: Optional[Dict[str, Any]] = None, target_size=(640, 640)):
+        super().__init__(daemon=True)
+        self.link = link
+        self.stop_event = stop_event
+        self.frame_ring = frame_ring
+        self.framerate = framerate or 0
+        self.stream = stream
+        self.target_size = target_size
+        self._oversize_logged = False
+
+    def _log(self, message: str):
+        print(f"[{datetime.now()}] [StreamCapture] {message}")
+
+    def _open(self):
+        if self.stream is not None and uses_gstreamer(self.stream):
+            cap = GstPipeline(self.stream, target_size=self.target_size, framerate=self.framerate)
+            if not cap.open():
+                cap.release()
+                return None
+            return cap
+
+        cap = cv2.VideoCapture(self.link)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return cap
+
+    def _fit_to_ring(self, frame):
+        """
+        Reescala (manteniendo el aspecto) los frames que no caben en los slots del
+        anillo, dimensionados a partir de `input.size`. Sin esto `write()` fallaría
+        y el servicio entraría en un bucle de reinicios.
+        """
+        max_h, max_w = self.frame_ring.max_shape[:2]
+        h, w = frame.shape[:2]
+        if h <= max_h and w <= max_w:
+            return frame
+
+        if not self._oversize_logged:
+            self._log(f"[❌] Error de configuración: la cámara entrega {w}x{h} pero input.size es {max_w}x{max_h}. "
+                      f"Se reescalan los frames; corrige input.size en config.json.")
+            self._oversize_logged = True
+        scale = min(max_w / w, max_h / h)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def run(self):
+        min_interval = 1.0 / self.framerate if self.framerate > 0 else 0.0
+        last_publish = 0.0
+        attempts = 0
+        cap = None
+        exit_code = 0
+
+        try:
+            while not self.stop_event.is_set():
+                if cap is None:
+                    cap = self._open()
+                    if cap is None:
+                        attempts += 1
+                        self._log(f"No se pudo abrir {self.link} (intento {attempts}/{self.MAX_RECONNECT_ATTEMPTS}).")
+                        if attempts >= self.MAX_RECONNECT_ATTEMPTS:
+                            exit_code = 1
+                            break
+                        self.stop_event.wait(self.RECONNECT_DELAY_SECONDS)
+                        continue
+                    self._log(f"Stream abierto: {self.link}")
+
+                # grab() descarta sin decodificar los frames que exceden el framerate configurado
+                if not cap.grab():
+                    fatal_error = getattr(cap, 'fatal_error', None)
+                    cap.release()
+                    cap = None
+                    if fatal_error:
+                        self._log(f"[❌] {fatal_error} No se reintenta la conexión.")
+                        exit_code = 1
+                        break
+                    # Un stream que abre pero no entrega frames cuenta como intento fallido
+                    attempts += 1
+                    self._log(f"Fallo al leer frame (intento {attempts}/{self.MAX_RECONNECT_ATTEMPTS}), reconectando...")
+                    if attempts >= self.MAX_RECONNECT_ATTEMPTS:
+                        exit_code = 1
+                        break
+                    self.stop_event.wait(self.RECONNECT_DELAY_SECONDS)
+                    continue
+                # Solo un frame recibido confirma que la conexión funciona
+                attempts = 0
+
+                now = time.monotonic()
+                if now - last_publish < min_interval:
+                    continue
+
+                ok, frame = cap.retrieve()
+                if not ok or frame is None:
+                    continue
+
+                self.frame_ring.write(self._fit_to_ring(frame))
+                last_publish = now
+
+        except Exception as e:
+            self._log(f"!!! ERROR en la captura: {e}")
+            exit_code = 1
+        finally:
+            if cap is not None:
+                cap.release()
+            self.frame_ring.set_status(
+                SharedFrameRing.STATUS_ERROR if exit_code else SharedFrameRing.STATUS_STOPPED
+            )
+            self._log(f"Proceso de captura finalizado (exit_code={exit_code}).")
+
+        if exit_code:
+            raise SystemExit(exit_code)
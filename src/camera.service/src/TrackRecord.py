@@ -0,0 +1,107 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Sequence
+
+
+class TrackRecord:
+    """
+    Registro compacto de una persona seguida por PersonRecognitionManager.
+
+    Reemplaza el dict de ~20 claves por track: los atributos van en `__slots__` y
+    la trayectoria es un anillo NumPy preasignado de `trail_depth` bboxes, en lugar
+    de copiar la lista de trails del tracker en cada frame. Los campos de resumen
+    (dirección, edad, género, clasificación de salida) se completan al finalizar.
+    """
+
+    __slots__ = (
+        "uuid", "origin_id", "first_appearance_time", "last_seen", "lost_since",
+        "frames_seen", "first_position", "last_position", "valid_track",
+        "event_log", "features",
+        "_trail", "_trail_next", "_trail_count",
+        "total_movement", "positions_summary", "direction", "direction_label",
+        "age", "gender", "gender_label", "inferred_exit_type", "exit_classification",
+    )
+
+    DEFAULT_TRAIL_DEPTH = 20
+
+    def __init__(self, uuid: str, track_id: int, bbox: Sequence[float], now: float,
+                 trail_depth: int = DEFAULT_TRAIL_DEPTH):
+        self.uuid = uuid
+        self.origin_id = track_id
+        self.first_appearance_time = now
+        self.last_seen = now
+        self.lost_since: Optional[float] = None
+        self.frames_seen = 1
+        self.first_position = bbox
+        self.last_position = bbox
+        self.valid_track = True
+        self.event_log: List[str] = ["detected"]
+        self.features: List[Any] = []
+
+        self._trail = np.zeros((max(1, trail_depth), 4), dtype=np.float32)
+        self._trail_next = 0
+        self._trail_count = 0
+        self._push_trail(bbox)
+
+        self.total_movement = 0
+        self.positions_summary: Optional[Dict[str, Any]] = None
+        self.direction: Optional[str] = None
+        self.direction_label: Optional[str] = None
+        self.age: Optional[float] = None
+        self.gender: Optional[float] = None
+        self.gender_label: Optional[str] = None
+        self.inferred_exit_type: Optional[str] = None
+        self.exit_classification: Optional[str] = None
+
+    def _push_trail(self, bbox: Sequence[float]):
+        if bbox is None or len(bbox) < 4:
+            return
+        self._trail[self._trail_next] = bbox[:4]
+        self._trail_next = (self._trail_next + 1) % len(self._trail)
+        self._trail_count = min(self._trail_count + 1, len(self._trail))
+
+    def observe(self, bbox: Sequence[float], now: float):
+        """Actualiza el registro con la detección del frame actual."""
+        self.last_seen = now
+        self.last_position = bbox
+        self.frames_seen += 1
+        self.lost_since = None
+        self._push_trail(bbox)
+
+    @property
+    def duration_tracked(self) -> float:
+        return self.last_seen - self.first_appearance_time
+
+    @property
+    def trail_length(self) -> int:
+        return self._trail_count
+
+    @property
+    def trail(self) -> np.ndarray:
+        """Bboxes (N, 4) de la trayectoria reciente, de la más antigua a la más nueva."""
+        if self._trail_count < len(self._trail):
+            return self._trail[:self._trail_count]
+        return np.concatenate((self._trail[self._trail_next:], self._trail[:self._trail_next]))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen serializable del track (sin la trayectoria ni las features crudas)."""
+        return {
+            "uuid": self.uuid,
+            "origin_id": self.origin_id,
+            "gender": self.gender,
+            "gender_label": self.gender_label,
+            "age": self.age,
+            "frames_seen": self.frames_seen,
+            "duration_tracked": self.duration_tracked,
+            "total_movement": self.total_movement,
+            "first_position": self.first_position,
+            "last_position": self.last_position,
+            "first_appearance_time": self.first_appearance_time,
+            "last_seen": self.last_seen,
+            "valid_track": self.valid_track,
+            "event_log": list(self.event_log),
+            "positions_summary": self.positions_summary,
+            "direction": self.direction,
+            "direction_label": self.direction_label,
+            "inferred_exit_type": self.inferred_exit_type,
+            "exit_classification": self.exit_classification,
+        }
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+
+class TrackStateStore:
+    """
+    Estado por track_id con desalojo automático (reemplazo acotado de un dict).
+
+    Se usa como un dict (`store[tid]`, `get`, `in`, `len`), pero:
+    - `retain(active_ids)` elimina los track_id que llevan más de `ttl_seconds`
+      fuera del conjunto activo del tracker (típicamente `result.trails`);
+    - nunca supera `max_size` entradas: al llenarse se desaloja la menos reciente (LRU).
+
+    `on_evict(track_id, valor)` se invoca por cada entrada desalojada, y `stats()`
+    reporta el tamaño y los desalojos por motivo para los logs periódicos.
+    """
+
+    DEFAULT_TTL_SECONDS = 10.0
+    DEFAULT_MAX_SIZE = 4096
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_size: int = DEFAULT_MAX_SIZE,
+                 on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self._clock = clock
+        # track_id -> (valor, último acceso); orden = del menos al más reciente
+        self._entries: "OrderedDict[Hashable, list]" = OrderedDict()
+        self.evicted = {"inactive": 0, "lru": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, track_id: Hashable) -> bool:
+        return track_id in self._entries
+
+    def __getitem__(self, track_id: Hashable) -> Any:
+        return self._entries[track_id][0]
+
+    def __setitem__(self, track_id: Hashable, value: Any):
+        entry = self._entries.get(track_id)
+        if entry is None:
+            self._entries[track_id] = [value, self._clock()]
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._evict(oldest, "lru")
+        else:
+            entry[0] = value
+            entry[1] = self._clock()
+            self._entries.move_to_end(track_id)
+
+    def get(self, track_id: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(track_id)
+        return default if entry is None else entry[0]
+
+    def items(self):
+        return ((track_id, entry[0]) for track_id, entry in self._entries.items())
+
+    def _evict(self, track_id: Hashable, reason: str):
+        value, _ = self._entries.pop(track_id)
+        self.evicted[reason] += 1
+        if self.on_evict is not None:
+            self.on_evict(track_id, value)
+
+    def retain(self, active_ids: Iterable[Hashable]):
+        """
+        Marca como vistos los track_id de `active_ids` y desaloja los que llevan más
+        de `ttl_seconds` fuera del conjunto activo (un track que desaparece un
+        instante y vuelve con el mismo id conserva su estado).
+        """
+        now = self._clock()
+        for track_id in active_ids:
+            entry = self._entries.get(track_id)
+            if entry is not None:
+                entry[1] = now
+                self._entries.move_to_end(track_id)
+
+        # Orden LRU: basta recorrer desde el inicio hasta la primera entrada vigente
+        deadline = now - self.ttl_seconds
+        while self._entries:
+            track_id, entry = next(iter(self._entries.items()))
+            if entry[1] >= deadline:
+                break
+            self._evict(track_id, "inactive")
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._entries), "max_size": self.max_size, "evicted": dict(self.evicted)}
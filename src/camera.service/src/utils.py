@@ -5,8 +5,111 @@ import cv2
 import io
 from PIL import Image
 
-def crop_and_resize_roi_padded(frame, roi={'enabled':False, 'points': []}, target_size=(640, 640), debug=False):
-    
+class LetterboxPlan:
+    """
+    Plan precalculado de recorte del ROI + letterbox para un stream.
+
+    El tamaño del frame y el ROI no cambian entre recargas de configuración, así que
+    el bounding box, las dimensiones del resize y los offsets del padding se calculan
+    una sola vez. `apply()` redimensiona directamente sobre un buffer preasignado
+    (`cv2.resize(..., dst=vista)`), sin `np.full` ni copias por frame.
+
+    Si varios frames del stream pueden estar en vuelo a la vez (pipeline de
+    inferencia), `acquire()` / `release()` reparten un pequeño pool de `pool_size`
+    buffers para usar con `apply(frame, out=buffer)`.
+
+    El resultado es el mismo que `crop_and_resize_roi_padded` (misma geometría e
+    interpolación).
+    """
+
+    def __init__(self, frame_shape, roi=None, target_size=(640, 640), pool_size=0):
+        frame_h, frame_w = frame_shape[:2]
+        channels = frame_shape[2] if len(frame_shape) == 3 else 1
+        self.frame_shape = tuple(frame_shape)
+        self.target_w, self.target_h = target_size
+
+        # Recorte: bounding box del ROI limitado al frame; frame completo si no hay ROI válido
+        x0, y0, x1, y1 = 0, 0, frame_w, frame_h
+        if roi is not None and len(roi.get('points', [])) > 0:
+            x, y, w, h = cv2.boundingRect(np.array(roi['points'], dtype=np.int32))
+            cx0, cy0 = max(0, x), max(0, y)
+            cx1, cy1 = min(frame_w, x + w), min(frame_h, y + h)
+            if w > 0 and h > 0 and cx1 > cx0 and cy1 > cy0:
+                x0, y0, x1, y1 = cx0, cy0, cx1, cy1
+        self.crop_x, self.crop_y = x0, y0
+        self.crop_w, self.crop_h = x1 - x0, y1 - y0
+        self.crop = (slice(y0, y1), slice(x0, x1))
+
+        # Mismo redondeo que resize_with_padding
+        aspect_ratio_orig = self.crop_w / self.crop_h
+        if aspect_ratio_orig > self.target_w / self.target_h:
+            new_w, new_h = self.target_w, int(self.target_w / aspect_ratio_orig)
+        else:
+            new_w, new_h = int(self.target_h * aspect_ratio_orig), self.target_h
+        self.new_w, self.new_h = max(1, new_w), max(1, new_h)
+        self.pad_x = (self.target_w - self.new_w) // 2
+        self.pad_y = (self.target_h - self.new_h) // 2
+
+        # Buffer reutilizado entre frames: `apply()` reescribe la vista central y vuelve a
+        # poner en negro las bandas de padding, donde pudieron caer anotaciones
+        self.buffer = np.zeros((self.target_h, self.target_w, channels), dtype=np.uint8)
+        self._view = self.buffer[self.pad_y:self.pad_y + self.new_h, self.pad_x:self.pad_x + self.new_w]
+        if channels == 1:
+            self._view = self._view[:, :, 0]
+        self.pool_size = pool_size
+        self._free = [self.new_output() for _ in range(pool_size)]
+
+    def matches(self, frame):
+        return frame.shape == self.frame_shape
+
+    def apply(self, frame, out=None):
+        """
+        Recorta y redimensiona `frame` sobre `out` (o el buffer propio del plan).
+        Con el buffer propio, el resultado es válido hasta la siguiente llamada.
+        """
+        target = self.buffer if out is None else out
+        view = self._view
+        if out is not None:
+            view = out[self.pad_y:self.pad_y + self.new_h, self.pad_x:self.pad_x + self.new_w]
+            if out.ndim == 3 and out.shape[2] == 1:
+                view = view[:, :, 0]
+        # Las anotaciones del frame anterior pueden haber caído en el padding: se limpian las bandas
+        target[:self.pad_y] = 0
+        target[self.pad_y + self.new_h:] = 0
+        target[:, :self.pad_x] = 0
+        target[:, self.pad_x + self.new_w:] = 0
+        cv2.resize(frame[self.crop], (self.new_w, self.new_h), dst=view, interpolation=cv2.INTER_AREA)
+        return target
+
+    def new_output(self):
+        """Lienzo negro del tamaño del modelo, para quien necesite conservar el resultado."""
+        return np.zeros_like(self.buffer)
+
+    def acquire(self):
+        """
+        Buffer libre del pool para `apply(frame, out=...)`. Si todos están en vuelo se
+        asigna uno nuevo en lugar de esperar: quien consume los resultados puede ser
+        el mismo hilo que llama aquí.
+        """
+        return self._free.pop() if self._free else self.new_output()
+
+    def release(self, buffer):
+        """Devuelve al pool un buffer de `acquire()` cuyo frame ya no se usa."""
+        if len(self._free) < self.pool_size and buffer.shape == self.buffer.shape:
+            self._free.append(buffer)
+
+
+def crop_and_resize_roi_padded(frame, roi={'enabled':False, 'points': []}, target_size=(640, 640), debug=False, plan=None):
+    """
+    Recorta el bounding box del ROI y lo redimensiona a `target_size` con letterbox.
+
+    Si se pasa un `LetterboxPlan` (construido una vez por stream) se usa su buffer
+    preasignado y no se recalcula nada por frame; el resultado es entonces el buffer
+    del plan, válido hasta la siguiente llamada.
+    """
+    if plan is not None and plan.matches(frame) and not debug:
+        return plan.apply(frame)
+
     if debug:
         print(f"\n--- DEBUG: Inicia crop_and_resize_roi_padded ---")
         print(f"DEBUG: Frame de entrada shape: {frame.shape}")
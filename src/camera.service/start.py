@@ -6,17 +6,14 @@ import argparse
 import os
 import sys
 import asyncio
-import multiprocessing as mp
-from src.utils import crop_and_resize_roi_padded
-from types import SimpleNamespace
-from ByteTrack.yolox.tracker.byte_tracker import BYTETracker
+from src.utils import crop_and_resize_roi_padded, load_config
 from src import StreamCapture as vs
+from src.SharedFrameRing import SharedFrameRing
+from src.GstPipeline import uses_gstreamer
+from src.PreviewPublisher import PreviewPublisher
 from dotenv import load_dotenv
 # from src.OpenAiService import OpenAiService # No usada aquí, mantenemos comentario
-from src.process_frame import process_frame, cleanup_tracks
-from src.config_utils import load_config
 import traceback
-import aiohttp
 from datetime import datetime # Nueva importación para timestamps
 import time # Nueva importación para time.sleep
 
@@ -43,118 +40,137 @@ if stream is None:
     raise ValueError(f"No se encontró la transmisión con ID {stream_id}")
 
 class mainStreamClass:
+
+    FRAME_WAIT_TIMEOUT = 1.0
+    STATS_LOG_INTERVAL = 60
+    PREVIEW_DEFAULT_FPS = 5
+    PREVIEW_DEFAULT_MAX_WIDTH = 960
+    PREVIEW_JPEG_QUALITY = 75
     
     def __init__(self):
         self.camProcess         = None
-        self.cam_queue          = None
+        self.frame_ring         = None
+        self.last_seq           = 0
+        self.last_stats_log     = time.monotonic()
         self.stopbit            = None
         self.camlink            = stream['input']['url']
         self.framerate          = stream['input']['fps']
-        self.session            = None
+        self.preview            = None
+        self.last_preview_time  = 0.0
+        # La vista previa tiene su propio fps/resolución, independiente del análisis
+        preview_cfg             = stream.get('preview', {})
+        self.preview_interval   = 1.0 / max(0.1, float(preview_cfg.get('fps', self.PREVIEW_DEFAULT_FPS)))
+        self.preview_max_width  = int(preview_cfg.get('max_width', self.PREVIEW_DEFAULT_MAX_WIDTH))
         self.exit_code          = 0 # 0 para salida limpia, 1 para error
-        self.tracker            = BYTETracker(
-            SimpleNamespace(
-                track_thresh    = stream['tracker'].get('track_thresh', 0.25),
-                track_buffer    = stream['tracker'].get('track_buffer', 30),
-                match_thresh    = stream['tracker'].get('match_thresh', 0.8),
-                mot20           = stream['tracker'].get('mot20', False),
-            ), 
-            frame_rate          =stream['input']['fps']
-        )
 
     async def startMain(self):
-        self.cam_queue = mp.Queue(maxsize=20) 
-        self.stopbit = mp.Event()
+        frame_w, frame_h = (640, 640) if uses_gstreamer(stream) else stream['input'].get('size', [1920, 1080])
+        self.frame_ring = SharedFrameRing(slots=4, max_shape=(frame_h, frame_w, 3))
+        self.stopbit = vs.CAPTURE_CONTEXT.Event()
         self.camProcess = vs.StreamCapture(
             self.camlink,
             self.stopbit,
-            self.cam_queue,
-            self.framerate
+            self.frame_ring,
+            self.framerate,
+            stream=stream
         )
         self.camProcess.start()
 
         await asyncio.sleep(0.5)
-        async with aiohttp.ClientSession() as session:
-            self.session = session
+        if os.getenv("SEND_TO_BACKEND") == "1":
+            self.preview = PreviewPublisher(stream_id)
+            self.preview.start()
 
-            try:
-                while True:
-                    if not self.camProcess.is_alive():
-                        print(f"[{datetime.now()}] [mainStreamClass] camProcess terminó. Saliendo.")
-                        break
-
-                    latest_frame = None
-
-                    # Vaciamos la cola, procesaremos solo el último frame disponible
-                    while not self.cam_queue.empty():
-                        cmd, frame = self.cam_queue.get_nowait()
-                        
-                        if cmd == vs.StreamCommands.ERROR:
-                            print(f"[{datetime.now()}] [mainStreamClass] StreamCapture reportó error. Esperando fin del proceso.")
-                            latest_frame = None
-                            break  # No procesamos más si se reporta error
-
-                        if cmd == vs.StreamCommands.FRAME and frame is not None:
-                            latest_frame = frame  # Nos quedamos con el último frame
-
-                    # Procesar solo si hay un frame nuevo
-                    if latest_frame is not None:
-                        detections_found = False
-                        
-                        if not detections_found:
-                            cv2.putText(frame, "Buscando...", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-
-                        if os.getenv("WINDOW_ENABLED") == "1":
-                            cv2.imshow('Cam: ' + self.camlink, frame)
-                            if cv2.waitKey(1) & 0xFF == ord('q'):
-                                self.exit_code = 0
-                                break
-
-                        if os.getenv("SEND_TO_BACKEND") == "1":
-                            is_success, im_buf_arr = cv2.imencode(".jpg", frame)
-                            if is_success:
-                                image_bytes = im_buf_arr.tobytes()
-                                await self._send_to_backend(image_bytes)
+        try:
+            while True:
+                if not self.camProcess.is_alive():
+                    if self.frame_ring.status == SharedFrameRing.STATUS_ERROR:
+                        print(f"[{datetime.now()}] [mainStreamClass] StreamCapture reportó error. Saliendo.")
+                        self.exit_code = 1
+                    print(f"[{datetime.now()}] [mainStreamClass] camProcess terminó. Saliendo.")
+                    break
+
+                # Esperamos (sin sondeo) a que StreamCapture publique un frame más nuevo
+                seq, frame = await asyncio.to_thread(
+                    self.frame_ring.wait_latest, self.last_seq, self.FRAME_WAIT_TIMEOUT
+                )
+
+                # Procesar solo si hay un frame nuevo
+                if frame is not None:
+                    self.last_seq = seq
+                    detections_found = False
                     
-                    await asyncio.sleep(0.005)
+                    if not detections_found:
+                        cv2.putText(frame, "Buscando...", (20, 40), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
 
-            except Exception as e:
-                print(f"[{datetime.now()}] [mainStreamClass] !!! ERROR en el bucle principal: {e}")
-                print(traceback.format_exc())
-                self.exit_code = 1
+                    if os.getenv("WINDOW_ENABLED") == "1":
+                        cv2.imshow('Cam: ' + self.camlink, frame)
+                        if cv2.waitKey(1) & 0xFF == ord('q'):
+                            self.exit_code = 0
+                            break
 
-            finally:
-                self.stopCamStream()
-                cv2.destroyAllWindows() 
-                sys.exit(self.exit_code)
+                    self._maybe_publish_preview(frame)
+
+                    frame = None
+                    self.frame_ring.release()
+                    self.frame_ring.mark_processed()
+
+                self._maybe_log_stats()
 
-    
-    async def _send_to_backend(self, image_bytes: bytes):
-        backend_url = f"http://127.0.0.1:8000/processed_stream/{stream_id}"
-        try:
-            async with self.session.post(backend_url, data=image_bytes, timeout=10) as resp:
-                resp.raise_for_status()
-                await resp.read()
-        except aiohttp.ClientError as e:
-            print(f"[{datetime.now()}] [mainStreamClass] Error al enviar frame procesado para {stream_id} (ClientError): {e}")
-        except asyncio.TimeoutError:
-            print(f"[{datetime.now()}] [mainStreamClass] Tiempo de espera agotado al enviar frame procesado para {stream_id}.")
         except Exception as e:
-            print(f"[{datetime.now()}] [mainStreamClass] Error general al enviar frame procesado para {stream_id}: {e}")
+            print(f"[{datetime.now()}] [mainStreamClass] !!! ERROR en el bucle principal: {e}")
+            print(traceback.format_exc())
+            self.exit_code = 1
+
+        finally:
+            if self.preview is not None:
+                await self.preview.close()
+            self.stopCamStream()
+            cv2.destroyAllWindows() 
+            sys.exit(self.exit_code)
+
+
+    def _maybe_publish_preview(self, frame):
+        """Codifica y publica un frame de vista previa solo si hay espectadores y toca según el fps de vista previa."""
+        if self.preview is None or not self.preview.active:
+            return
+        now = time.monotonic()
+        if now - self.last_preview_time < self.preview_interval:
+            return
+        self.last_preview_time = now
+
+        h, w = frame.shape[:2]
+        if w > self.preview_max_width:
+            scale = self.preview_max_width / w
+            frame = cv2.resize(frame, (self.preview_max_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+
+        is_success, im_buf_arr = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.PREVIEW_JPEG_QUALITY])
+        if is_success:
+            # Sin espera: el publicador envía el último frame cuando el canal queda libre
+            self.preview.publish(im_buf_arr.tobytes())
+
+    def _maybe_log_stats(self):
+        now = time.monotonic()
+        if now - self.last_stats_log < self.STATS_LOG_INTERVAL:
+            return
+        self.last_stats_log = now
+        stats = self.frame_ring.stats()
+        print(
+            f"[{datetime.now()}] [mainStreamClass] Frames {stream_id}: "
+            f"capturados={stats['captured']} descartados={stats['dropped']} "
+            f"procesados={stats['processed']} retraso={stats['lag']}"
+        )
+        if self.preview is not None:
+            print(
+                f"[{datetime.now()}] [mainStreamClass] Vista previa {stream_id}: "
+                f"espectadores={self.preview.viewers} enviados={self.preview.sent} descartados={self.preview.dropped}"
+            )
 
     def stopCamStream(self):
         print(f"[{datetime.now()}] [mainStreamClass] En stopCamStream")
         if self.stopbit is not None:
             self.stopbit.set() # Señaliza al subproceso de la cámara que se detenga
             try:
-                while not self.cam_queue.empty():
-                    try:
-                        _ = self.cam_queue.get_nowait()
-                    except:
-                        break
-                self.cam_queue.close()
-                self.cam_queue.join_thread()
-                
                 # Dale un tiempo para que el proceso de la cámara termine de forma limpia
                 # Si StreamCapture se cerró limpiamente (exit_code 0), join debería ser rápido.
                 # Si se cerró con error (exit_code 1), ya estará muerto.
@@ -164,7 +180,10 @@ class mainStreamClass:
                     self.camProcess.terminate()
                     self.camProcess.join()
             except Exception as e:
-                print(f"[{datetime.now()}] [mainStreamClass] Error durante la limpieza de la cámara/cola: {e}")
+                print(f"[{datetime.now()}] [mainStreamClass] Error durante la limpieza de la cámara: {e}")
+
+        if self.frame_ring is not None:
+            self.frame_ring.close()
 
         print(f"[{datetime.now()}] [mainStreamClass] Camera stream stopped")
         print(f"[{datetime.now()}] [mainStreamClass] Exiting mainStreamClass")
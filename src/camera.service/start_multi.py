@@ -0,0 +1,30 @@
+import os
+import cv2
+import src.utils as vhs_utils
+from dotenv import load_dotenv
+from src.MultiStreamScheduler import MultiStreamScheduler
+
+load_dotenv()
+
+# Modo multi-stream: un único proceso atiende todas las cámaras de config.json
+# y comparte un solo juego de modelos cargados en el Hailo.
+config = vhs_utils.load_config(os.path.join('/var/lib/vhs', 'config.json'))
+streams = config.get('streams', [])
+
+
+def show_frame(stream, frame):
+    cv2.imshow(f"Cam: {stream.get('name') or stream.get('id')}", frame)
+    cv2.waitKey(1)
+
+
+if __name__ == "__main__":
+    on_frame = show_frame if os.getenv("WINDOW_ENABLED") == "1" else None
+    scheduler = MultiStreamScheduler(config, streams, on_frame=on_frame)
+
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        print("Interrupción recibida. Deteniendo streams...")
+    finally:
+        scheduler.stop()
+        cv2.destroyAllWindows()
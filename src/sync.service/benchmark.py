@@ -0,0 +1,325 @@
+"""
+Benchmark del camino de sincronización (SyncDocumentsUseCase).
+
+Genera N detecciones sintéticas con el formato de camera.service (log de
+eventos segmentado con registros msgpack, o el formato anterior de archivos
+`<uuid>.json`) y mide cuánto
+tarda `SyncDocumentsUseCase` en drenarlas contra un destino local: un fake en
+proceso que implementa `bulk_write`, o mongomock si está instalado.
+
+Reporta documentos/segundo, bytes almacenados por documento, RSS máximo y syscalls de lectura/escritura por
+documento, para estimar si la puesta al día tras días sin conexión cabe en la
+ventana de mantenimiento.
+
+Uso:
+    python benchmark.py --docs 1000,10000,100000 --format log
+    python benchmark.py --docs 50000 --format legacy --backend mongomock
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import argparse
+import logging
+import resource
+import tempfile
+import zlib
+from typing import Dict, Optional
+import msgpack
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.EventLogReader import EVENT_LOG_SUBDIR, RECORD_HEADER  # noqa: E402
+from src.SyncDocumentsUseCase import SyncDocumentsUseCase  # noqa: E402
+
+SEGMENT_BYTES = 4 * 1024 * 1024
+# Base de datos propia del benchmark: no depende de MONGO_DB_NAME del servicio
+BENCHMARK_DB_NAME = "vhs_benchmark"
+
+
+# ----------------------------------------------------------------------
+# Destino local
+# ----------------------------------------------------------------------
+
+class _BulkWriteResult:
+    def __init__(self, upserted_count: int, modified_count: int):
+        self.upserted_count = upserted_count
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """
+    Colección en memoria que implementa el subconjunto de `bulk_write` que usa la
+    sincronización. Solo guarda los uuid, para que el RSS medido sea el del
+    camino de sincronización y no el del destino.
+    """
+
+    def __init__(self):
+        self.uuids = set()
+        self.bulk_calls = 0
+
+    def bulk_write(self, requests, ordered: bool = True):
+        self.bulk_calls += 1
+        upserted = modified = 0
+        for op in requests:
+            key = op._filter["uuid"]
+            if key in self.uuids:
+                modified += 1
+            else:
+                self.uuids.add(key)
+                upserted += 1
+        return _BulkWriteResult(upserted, modified)
+
+    def count_documents(self, _filter) -> int:
+        return len(self.uuids)
+
+
+class FakeClient:
+    """Sustituto de `MongoClient`: `client[db][coleccion]` devuelve siempre la misma FakeCollection."""
+
+    def __init__(self):
+        self.collection = FakeCollection()
+
+    def __getitem__(self, _db_name):
+        return _FakeDatabase(self.collection)
+
+    def close(self):
+        pass
+
+
+class _FakeDatabase:
+    def __init__(self, collection: FakeCollection):
+        self.collection = collection
+
+    def __getitem__(self, _collection_name):
+        return self.collection
+
+
+class _MongomockCollection:
+    """
+    Adapta `bulk_write` para mongomock: su BulkOperationBuilder no acepta el
+    argumento `sort` que `UpdateOne` de pymongo >= 4.9 le pasa, así que cada
+    operación se aplica con `update_one`.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def bulk_write(self, requests, ordered: bool = True):
+        upserted = modified = 0
+        for op in requests:
+            result = self.collection.update_one(op._filter, op._doc, upsert=bool(op._upsert))
+            if result.upserted_id is not None:
+                upserted += 1
+            else:
+                modified += result.modified_count
+        return _BulkWriteResult(upserted, modified)
+
+    def count_documents(self, _filter) -> int:
+        return self.collection.count_documents(_filter)
+
+
+class _MongomockClient:
+    def __init__(self, client):
+        self.client = client
+
+    def __getitem__(self, db_name):
+        return _MongomockDatabase(self.client[db_name])
+
+    def close(self):
+        self.client.close()
+
+
+class _MongomockDatabase:
+    def __init__(self, database):
+        self.database = database
+
+    def __getitem__(self, collection_name):
+        return _MongomockCollection(self.database[collection_name])
+
+
+def make_client(backend: str):
+    if backend == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("mongomock no está instalado: pip install mongomock (o use --backend fake)")
+        return _MongomockClient(mongomock.MongoClient())
+
+    return FakeClient()
+
+
+# ----------------------------------------------------------------------
+# Datos sintéticos
+# ----------------------------------------------------------------------
+
+def synthetic_detection(index: int) -> dict:
+    """Documento con los campos que produce EventProcessor al finalizar una persona."""
+    now = time.time()
+    return {
+        "tid": index,
+        "uuid": str(uuid.uuid4()),
+        "name": "Puerta",
+        "type": "person_crossed_line",
+        "direction": random.choice(["Up", "Left", "Right"]),
+        "class_name": "head",
+        "timestamp": now,
+        "place_code": "BENCH",
+        "stream_code": "CAM01",
+        "features": [
+            [
+                {"label": random.choice(["Male", "Female"]), "score": random.random(), "category_id": 0},
+                {"label": "Age", "score": random.uniform(10, 80), "category_id": 0},
+            ]
+            for _ in range(3)
+        ],
+        "start_time": now - 2.0,
+        "is_complete": True,
+        "inference_in_progress": False,
+        "inference_failures": 0,
+        "last_inference_time": now,
+        "error_during_inference": None,
+    }
+
+
+def synthetic_record(index: int) -> dict:
+    """Registro compacto (DetectionRecord, esquema 1) que camera.service guarda en el log."""
+    event = synthetic_detection(index)
+    return {
+        "schema": 1,
+        "uuid": event["uuid"],
+        "tid": event["tid"],
+        "place_code": event["place_code"],
+        "stream_code": event["stream_code"],
+        "name": event["name"],
+        "type": event["type"],
+        "direction": event["direction"],
+        "class_name": event["class_name"],
+        "timestamp": event["timestamp"],
+        "start_time": event["start_time"],
+        "gender": random.choice(["Male", "Female"]),
+        "gender_confidence": round(random.random(), 3),
+        "age": round(random.uniform(10, 80), 1),
+        "inferences": 3,
+        "inference_failures": 0,
+    }
+
+
+def _encode_msgpack(index: int) -> bytes:
+    body = msgpack.packb(synthetic_record(index), use_bin_type=True)
+    return RECORD_HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def generate_log(directory: str, docs: int):
+    log_dir = os.path.join(directory, EVENT_LOG_SUBDIR)
+    os.makedirs(log_dir, exist_ok=True)
+    segment, f, size = 0, None, SEGMENT_BYTES
+    for i in range(docs):
+        if size >= SEGMENT_BYTES:
+            if f is not None:
+                f.close()
+            segment += 1
+            f = open(os.path.join(log_dir, f"bench-{segment:08d}.mpk"), "wb")
+            size = 0
+        data = _encode_msgpack(i)
+        f.write(data)
+        size += len(data)
+    if f is not None:
+        f.close()
+
+
+def generate_legacy(directory: str, docs: int):
+    for i in range(docs):
+        data = synthetic_detection(i)
+        with open(os.path.join(directory, f"{data['uuid']}.json"), "w") as f:
+            json.dump(data, f, indent=4)
+
+
+GENERATORS = {"log": generate_log, "legacy": generate_legacy}
+
+
+# ----------------------------------------------------------------------
+# Métricas
+# ----------------------------------------------------------------------
+
+def read_proc_io() -> Optional[Dict[str, int]]:
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(":") for line in f)}
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss está en KiB en Linux (en bytes en macOS)
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run(docs: int, data_format: str, backend: str, chunk_size: int, keep: bool) -> Dict[str, float]:
+    directory = tempfile.mkdtemp(prefix="vhs-sync-bench-")
+    try:
+        GENERATORS[data_format](directory, docs)
+        stored_bytes = sum(
+            entry.stat().st_size
+            for root in (directory, os.path.join(directory, EVENT_LOG_SUBDIR)) if os.path.isdir(root)
+            for entry in os.scandir(root) if entry.is_file()
+        )
+
+        client = make_client(backend)
+        use_case = SyncDocumentsUseCase(directory, client=client)
+        use_case.db_name = BENCHMARK_DB_NAME
+        use_case.CHUNK_SIZE = chunk_size
+
+        io_before = read_proc_io()
+        started_at = time.perf_counter()
+        ok = use_case.execute()
+        elapsed = time.perf_counter() - started_at
+        io_after = read_proc_io()
+
+        synced = client[use_case.db_name][use_case.collection_name].count_documents({})
+        if not ok or synced != docs:
+            print(f"[⚠️] Sincronización incompleta: {synced}/{docs} documentos")
+
+        result = {
+            "docs": docs,
+            "seconds": elapsed,
+            "docs_per_sec": docs / elapsed if elapsed > 0 else float("inf"),
+            "peak_rss_mb": peak_rss_mb(),
+            "bytes_per_doc": stored_bytes / docs,
+        }
+        if io_before and io_after:
+            result["read_syscalls_per_doc"] = (io_after["syscr"] - io_before["syscr"]) / docs
+            result["write_syscalls_per_doc"] = (io_after["syscw"] - io_before["syscw"]) / docs
+        return result
+    finally:
+        if keep:
+            print(f"Datos conservados en {directory}")
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de SyncDocumentsUseCase")
+    parser.add_argument("--docs", default="1000,10000", help="Cantidades de documentos separadas por coma")
+    parser.add_argument("--format", choices=sorted(GENERATORS), default="log", dest="data_format")
+    parser.add_argument("--backend", choices=["fake", "mongomock"], default="fake")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--keep", action="store_true", help="No borrar los datos generados")
+    args = parser.parse_args()
+
+    # Los logs por bloque de la sincronización distorsionan la medición
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'docs':>8} {'seg':>8} {'docs/s':>10} {'bytes/doc':>10} {'RSS máx MB':>11} {'syscr/doc':>10} {'syscw/doc':>10}")
+    for docs in (int(n) for n in args.docs.split(",")):
+        r = run(docs, args.data_format, args.backend, args.chunk_size, args.keep)
+        print(f"{r['docs']:>8} {r['seconds']:>8.2f} {r['docs_per_sec']:>10.0f} {r['bytes_per_doc']:>10.0f} {r['peak_rss_mb']:>11.1f} "
+              f"{r.get('read_syscalls_per_doc', float('nan')):>10.2f} {r.get('write_syscalls_per_doc', float('nan')):>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
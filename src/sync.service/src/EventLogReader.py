@@ -0,0 +1,189 @@
+import os
+import re
+import json
+import zlib
+import struct
+import time
+import logging
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
+import msgpack
+
+EVENT_LOG_SUBDIR = "log"
+NOTIFY_SOCKET_NAME = ".sync.sock"
+# Segmentos `.mpk`: registros msgpack con prefijo (longitud, CRC32)
+_SEGMENT_RE = re.compile(r"^(?P<writer>.+)-(?P<index>\d{8})\.mpk$")
+RECORD_HEADER = struct.Struct(">II")
+MAX_RECORD_BYTES = 1024 * 1024
+# Igual que `EventLog.MAX_SEGMENT_AGE_SECONDS` en camera.service: un segmento sin escrituras
+# durante más tiempo ya no se reutiliza, el escritor rota antes de su próxima escritura
+MAX_SEGMENT_AGE_SECONDS = 3600
+
+# Posición confirmada por escritor: {writer_id: [índice_de_segmento, offset_en_bytes]}
+Position = Dict[str, List[int]]
+
+
+class EventLogReader:
+    """
+    Lector del log de eventos segmentado que escribe camera.service (`EventLog`).
+
+    `read()` devuelve los registros pendientes a partir del último offset
+    confirmado y la posición alcanzada; `commit(position)` persiste esa posición
+    (escritura atómica del checkpoint) y elimina los segmentos ya consumidos por
+    completo. Si la subida falla y no se confirma, el siguiente `read()` vuelve a
+    entregar los mismos registros.
+    """
+
+    def __init__(self, directory: str, name: str = "sync"):
+        self.directory = os.path.join(directory, EVENT_LOG_SUBDIR)
+        self.checkpoint_path = os.path.join(self.directory, f".{name}.checkpoint.json")
+        self.notify_socket_path = os.path.join(self.directory, NOTIFY_SOCKET_NAME)
+        self.position: Position = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> Position:
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return {writer: list(pos) for writer, pos in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            logging.error(f"Checkpoint inválido en {self.checkpoint_path}: {e}. Se relee el log desde el inicio.")
+            return {}
+
+    def _segments(self) -> Dict[str, List[int]]:
+        """Índices de segmento existentes, ordenados, agrupados por escritor."""
+        segments: Dict[str, List[int]] = {}
+        if not os.path.isdir(self.directory):
+            return segments
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_RE.match(name)
+            if match:
+                writer, index = match.group("writer"), int(match.group("index"))
+                segments.setdefault(writer, []).append(index)
+        for indexes in segments.values():
+            indexes.sort()
+        return segments
+
+    def _path(self, writer: str, index: int) -> str:
+        return os.path.join(self.directory, f"{writer}-{index:08d}.mpk")
+
+    @staticmethod
+    def _next_msgpack_record(f: BinaryIO, path: str) -> Tuple[int, Optional[Any]]:
+        """Retorna `(bytes_consumidos, registro)`; `(0, None)` si el registro aún no está completo."""
+        header = f.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            return 0, None
+        length, crc = RECORD_HEADER.unpack(header)
+        if length > MAX_RECORD_BYTES:
+            # Cabecera corrupta: no hay forma fiable de resincronizar, se descarta el resto del segmento
+            remaining = os.fstat(f.fileno()).st_size - f.tell()
+            logging.error(f"Cabecera inválida en {path} (longitud {length}). Se omiten {remaining} bytes.")
+            f.seek(0, os.SEEK_END)
+            return RECORD_HEADER.size + remaining, None
+        body = f.read(length)
+        if len(body) < length:
+            return 0, None
+        consumed = RECORD_HEADER.size + length
+        if zlib.crc32(body) != crc:
+            logging.error(f"Registro corrupto (CRC) en {path}. Se omite.")
+            return consumed, None
+        try:
+            return consumed, msgpack.unpackb(body, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            logging.error(f"Registro inválido en {path}: {e}. Se omite.")
+            return consumed, None
+
+    def read(self, max_records: int = 1000) -> Tuple[List[Dict[str, Any]], Position]:
+        """
+        Lee hasta `max_records` registros completos posteriores a la posición
+        confirmada. Los registros incompletos (escritura en curso) se dejan para
+        la próxima lectura; los corruptos se omiten.
+        """
+        records: List[Dict[str, Any]] = []
+        position: Position = {writer: list(pos) for writer, pos in self.position.items()}
+
+        for writer, indexes in self._segments().items():
+            committed_index, committed_offset = position.get(writer, [0, 0])
+            for index in indexes:
+                if len(records) >= max_records:
+                    break
+                if index < committed_index:
+                    continue
+                offset = committed_offset if index == committed_index else 0
+
+                path = self._path(writer, index)
+                with open(path, 'rb') as f:
+                    f.seek(offset)
+                    while len(records) < max_records:
+                        consumed, record = self._next_msgpack_record(f, path)
+                        if consumed == 0:
+                            break
+                        offset += consumed
+                        if record is not None:
+                            records.append(record)
+
+                position[writer] = [index, offset]
+                committed_index, committed_offset = index, offset
+
+        return records, position
+
+    def commit(self, position: Position):
+        """Confirma `position` y elimina los segmentos que ya no se necesitan."""
+        self._write_checkpoint(position)
+        self.position = {writer: list(pos) for writer, pos in position.items()}
+        drained = self._remove_consumed_segments()
+        if drained:
+            # Sin segmentos, el escritor vuelve a numerar desde el último que quede en disco
+            # (o desde 1 si reinicia): se olvida su posición para leer desde el inicio lo nuevo
+            for writer in drained:
+                self.position.pop(writer, None)
+            self._write_checkpoint(self.position)
+
+    def _write_checkpoint(self, position: Position):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(position, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _remove_consumed_segments(self) -> List[str]:
+        """
+        Elimina los segmentos consumidos por completo. El más reciente de cada escritor
+        solo se elimina si además lleva `MAX_SEGMENT_AGE_SECONDS` sin escrituras (p. ej.
+        una cámara sin tráfico). Retorna los escritores que quedaron sin segmentos.
+        """
+        drained = []
+        for writer, indexes in self._segments().items():
+            committed_index, committed_offset = self.position.get(writer, [0, 0])
+            latest = indexes[-1]
+            for index in indexes:
+                path = self._path(writer, index)
+                consumed = index < committed_index or (
+                    index == committed_index and committed_offset >= os.path.getsize(path)
+                )
+                if not consumed:
+                    break
+                if index == latest and time.time() - os.path.getmtime(path) < MAX_SEGMENT_AGE_SECONDS:
+                    # El segmento más reciente puede seguir recibiendo escrituras
+                    break
+                try:
+                    os.remove(path)
+                    logging.info(f"Segmento consumido eliminado: {path}")
+                except OSError as e:
+                    logging.error(f"Error al eliminar el segmento {path}: {e}")
+                    break
+                if index == latest:
+                    drained.append(writer)
+        return drained
+
+    def pending_bytes(self) -> int:
+        """Bytes del log aún no confirmados (aproximado, para métricas)."""
+        total = 0
+        for writer, indexes in self._segments().items():
+            committed_index, committed_offset = self.position.get(writer, [0, 0])
+            for index in indexes:
+                if index < committed_index:
+                    continue
+                size = os.path.getsize(self._path(writer, index))
+                total += size - committed_offset if index == committed_index else size
+        return total
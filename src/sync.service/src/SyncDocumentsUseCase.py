@@ -1,10 +1,12 @@
 import os
 import json
 import logging
+from itertools import islice
 import requests # No se usa en el código proporcionado, pero se mantiene si es parte de un contexto más amplio.
 from pymongo import MongoClient, UpdateOne
-from pymongo.errors import PyMongoError
+from pymongo.errors import BulkWriteError, PyMongoError
 from dotenv import load_dotenv
+from src.EventLogReader import EventLogReader
 
 # Configurar logging
 logging.basicConfig(
@@ -16,85 +18,125 @@ load_dotenv('/opt/vhs/src/setup.service/.env')
 
 class SyncDocumentsUseCase:
 
-    def __init__(self, directory: str):
+    def __init__(self, directory: str, client: MongoClient = None):
         self.directory = directory
         self.mongo_uri = os.getenv("MONGO_URI")
         self.db_name = os.getenv("MONGO_DB_NAME")
         self.collection_name = 'detections'
+        self.log_reader = EventLogReader(directory)
+        # Tamaño máximo de cada bulk_write: cada bloque se confirma por separado,
+        # por lo que un corte de red solo obliga a reenviar el bloque en curso.
+        self.CHUNK_SIZE = 500
+        # Un único cliente (con su pool de conexiones) durante toda la vida del servicio
+        self._client = client
  
-    def execute(self):
+    @property
+    def collection(self):
+        if self._client is None:
+            # Compresión del protocolo: reduce los bytes por detección en enlaces móviles
+            self._client = MongoClient(self.mongo_uri, serverSelectionTimeoutMS=10000, compressors="zlib")
+        return self._client[self.db_name][self.collection_name]
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def execute(self) -> bool:
+        """Sincroniza lo pendiente. Retorna False si la base de datos no estuvo disponible."""
         logging.info("Iniciando sincronización de documentos...")
-
-        json_files = [f for f in os.listdir(self.directory) if f.endswith('.json')]
-        if not json_files:
-            logging.warning(f"No se encontraron archivos JSON en {self.directory}")
-            return
-
-        logging.info(f"Se encontraron {len(json_files)} archivos JSON en {self.directory}")
-
+        ok = self.sync_event_log() and self.sync_legacy_files()
+        logging.info("Finalizado el proceso de sincronización.")
+        return ok
+
+    def sync_event_log(self) -> bool:
+        """Sube el log de eventos en bloques y confirma el offset tras cada bloque aceptado."""
+        while True:
+            records, position = self.log_reader.read(self.CHUNK_SIZE)
+            if not records:
+                if position != self.log_reader.position:
+                    # Solo había líneas corruptas: se avanza igualmente
+                    self.log_reader.commit(position)
+                return True
+
+            requests_bulk = [
+                UpdateOne({"uuid": data["uuid"]}, {"$set": data}, upsert=True)
+                for data in records if isinstance(data, dict) and data.get("uuid")
+            ]
+            logging.info(f"Se leyeron {len(records)} registros del log de eventos ({len(requests_bulk)} válidos)")
+
+            if requests_bulk and not self._bulk_upsert(requests_bulk):
+                # Sin confirmar: el próximo ciclo retoma desde el último bloque confirmado
+                return False
+            self.log_reader.commit(position)
+
+    def _bulk_upsert(self, requests_bulk) -> bool:
+        """
+        Envía un bloque con `ordered=False`. Retorna True si el servidor lo aceptó,
+        incluso con errores por documento (reenviarlos no los corregiría). Los
+        errores de write concern son transitorios: el bloque queda sin confirmar
+        para reenviarse (el upsert por `uuid` lo hace idempotente).
+        """
+        try:
+            result = self.collection.bulk_write(requests_bulk, ordered=False)
+            logging.info(f"Insertados/actualizados {result.upserted_count} documentos nuevos y modificados {result.modified_count} en la colección {self.collection_name}")
+            return True
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            write_concern_errors = e.details.get("writeConcernErrors", [])
+            if write_concern_errors or not write_errors:
+                logging.error(f"bulk_write con errores de write concern (se reintentará el bloque): {write_concern_errors[:3]}")
+                return False
+            logging.error(f"bulk_write completado con {len(write_errors)} documentos rechazados: {write_errors[:3]}")
+            return True
+        except PyMongoError as e:
+            logging.error(f"Error de conexión con MongoDB o error en bulk_write: {e}")
+        except Exception as e:
+            logging.error(f"Error inesperado durante la operación de base de datos: {e}")
+        return False
+
+    def sync_legacy_files(self) -> bool:
+        """Drena, en bloques, los archivos `<uuid>.json` que quedaron del formato de almacenamiento anterior."""
+        if not os.path.isdir(self.directory):
+            logging.warning(f"No existe el directorio de detecciones {self.directory}")
+            return True
+
+        with os.scandir(self.directory) as entries:
+            json_files = (entry.path for entry in entries if entry.is_file() and entry.name.endswith('.json'))
+            while True:
+                chunk = list(islice(json_files, self.CHUNK_SIZE))
+                if not chunk:
+                    return True
+                if not self._sync_file_chunk(chunk):
+                    return False
+
+    def _sync_file_chunk(self, file_paths) -> bool:
         requests_bulk = []
-        data_by_file = {} # Esto ahora almacenará el nombre del archivo si es necesario para la eliminación.
-        files_to_delete_on_success = [] # Nueva lista para almacenar las rutas de los archivos a eliminar
+        files_to_delete_on_success = []
 
-        for file in json_files:
-            file_path = os.path.join(self.directory, file)
+        for file_path in file_paths:
             try:
                 with open(file_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-
-                    # No necesitamos almacenar la data, solo la ruta del archivo si el documento es válido
-                    files_to_delete_on_success.append(file_path)
-
-                    filter_query = {"uuid": data["uuid"]}
-                    requests_bulk.append(
-                        UpdateOne(
-                            filter_query,
-                            {"$set": data},
-                            upsert=True
-                        )
-                    )
-                    logging.info(f"Preparado para insertar/actualizar: {file}")
-
-            except json.JSONDecodeError as e: # Mejorar el manejo de errores para JSON inválido
-                logging.error(f"Error: El archivo {file} no es un JSON válido. Detalles: {e}")
-                # Si el archivo no es un JSON válido, no lo añadimos a files_to_delete_on_success
-                if file_path in files_to_delete_on_success:
-                    files_to_delete_on_success.remove(file_path) # Asegurarse de que no se elimine si hubo error
+                requests_bulk.append(UpdateOne({"uuid": data["uuid"]}, {"$set": data}, upsert=True))
+                files_to_delete_on_success.append(file_path)
+            except json.JSONDecodeError as e:
+                # Si el archivo no es un JSON válido no se elimina, para poder revisarlo
+                logging.error(f"Error: El archivo {file_path} no es un JSON válido. Detalles: {e}")
             except Exception as e:
-                logging.error(f"Error inesperado al leer {file}: {e}")
-                if file_path in files_to_delete_on_success:
-                    files_to_delete_on_success.remove(file_path) # Asegurarse de que no se elimine si hubo error
+                logging.error(f"Error inesperado al leer {file_path}: {e}")
 
+        if not requests_bulk:
+            return True
 
-        if requests_bulk:
-            try:
-                client = MongoClient(self.mongo_uri)
-                db = client[self.db_name]
-                collection = db[self.collection_name]
-
-                result = collection.bulk_write(requests_bulk)
-                logging.info(f"Insertados/actualizados {result.upserted_count} documentos nuevos y modificados {result.modified_count} en la colección {self.collection_name}")
-                
-                # --- INICIO DEL CÓDIGO AÑADIDO PARA ELIMINAR ARCHIVOS ---
-                if files_to_delete_on_success:
-                    logging.info("Iniciando eliminación de archivos JSON procesados exitosamente...")
-                    for file_path in files_to_delete_on_success:
-                        try:
-                            os.remove(file_path)
-                            logging.info(f"Archivo eliminado: {file_path}")
-                        except OSError as e:
-                            logging.error(f"Error al eliminar el archivo {file_path}: {e}")
-                else:
-                    logging.warning("No hay archivos para eliminar después del procesamiento exitoso.")
-                # --- FIN DEL CÓDIGO AÑADIDO PARA ELIMINAR ARCHIVOS ---
-
-                client.close()
-
-            except PyMongoError as e:
-                logging.error(f"Error de conexión con MongoDB o error en bulk_write: {e}")
-            except Exception as e:
-                logging.error(f"Error inesperado durante la operación de base de datos o eliminación de archivos: {e}")
-        else:
-            logging.warning("No se encontraron documentos válidos para insertar.")
+        logging.info(f"Sincronizando bloque de {len(requests_bulk)} archivos JSON de {self.directory}")
+        if not self._bulk_upsert(requests_bulk):
+            return False
 
-        logging.info("Finalizado el proceso de sincronización.")
\ No newline at end of file
+        for file_path in files_to_delete_on_success:
+            try:
+                os.remove(file_path)
+            except OSError as e:
+                logging.error(f"Error al eliminar el archivo {file_path}: {e}")
+        logging.info(f"Eliminados {len(files_to_delete_on_success)} archivos JSON sincronizados")
+        return True
@@ -0,0 +1,111 @@
+import os
+import select
+import socket
+import time
+import logging
+from typing import Optional
+from src.SyncDocumentsUseCase import SyncDocumentsUseCase
+
+
+class SyncScheduler:
+    """
+    Dispara la sincronización cuando camera.service avisa que añadió detecciones.
+
+    - Escucha un socket Unix datagrama (`EventLogReader.notify_socket_path`); los
+      avisos que llegan juntos se agrupan con un debounce de `DEBOUNCE_SECONDS`,
+      pero nunca se espera más de `MAX_LATENCY_SECONDS` desde el primer aviso.
+    - Sin avisos, sincroniza igualmente cada `FALLBACK_INTERVAL_SECONDS` (archivos
+      antiguos o avisos perdidos mientras el servicio estaba detenido).
+    - Si la base de datos no está disponible, reintenta con backoff exponencial
+      entre `MIN_BACKOFF_SECONDS` y `MAX_BACKOFF_SECONDS`.
+    """
+
+    DEBOUNCE_SECONDS = 2.0
+    MAX_LATENCY_SECONDS = 10.0
+    FALLBACK_INTERVAL_SECONDS = 300.0
+    MIN_BACKOFF_SECONDS = 5.0
+    MAX_BACKOFF_SECONDS = 300.0
+
+    def __init__(self, use_case: SyncDocumentsUseCase):
+        self.use_case = use_case
+        self.socket_path = use_case.log_reader.notify_socket_path
+        self._socket = self._bind()
+        self._backoff = 0.0
+
+    def _bind(self) -> Optional[socket.socket]:
+        try:
+            os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            sock.bind(self.socket_path)
+            sock.setblocking(False)
+            logging.info(f"Escuchando avisos de nuevas detecciones en {self.socket_path}")
+            return sock
+        except OSError as e:
+            logging.error(f"No se pudo abrir el socket de avisos {self.socket_path}: {e}. Solo se usará el intervalo de respaldo.")
+            return None
+
+    def _wait_notification(self, timeout: float) -> bool:
+        """Espera hasta `timeout` segundos por un aviso; vacía todos los avisos acumulados."""
+        if self._socket is None:
+            time.sleep(max(0.0, timeout))
+            return False
+
+        readable, _, _ = select.select([self._socket], [], [], max(0.0, timeout))
+        if not readable:
+            return False
+        while True:
+            try:
+                self._socket.recv(64)
+            except BlockingIOError:
+                return True
+
+    def _debounce(self):
+        """Tras el primer aviso, espera a que haya `DEBOUNCE_SECONDS` sin avisos o a la latencia máxima."""
+        deadline = time.monotonic() + self.MAX_LATENCY_SECONDS
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            if not self._wait_notification(min(self.DEBOUNCE_SECONDS, remaining)):
+                return
+
+    def run_once(self, wait: float):
+        notified = self._wait_notification(wait)
+        if notified:
+            self._debounce()
+
+        if self.use_case.execute():
+            self._backoff = 0.0
+        else:
+            self._backoff = min(
+                self.MAX_BACKOFF_SECONDS,
+                max(self.MIN_BACKOFF_SECONDS, self._backoff * 2)
+            )
+            logging.warning(f"Base de datos no disponible. Próximo intento en {self._backoff:.0f}s")
+
+    def run(self):
+        # Sincronización inicial: lo que quedó pendiente mientras el servicio estaba detenido
+        wait = 0.0
+        try:
+            while True:
+                self.run_once(wait)
+                if self._backoff > 0:
+                    # En backoff los avisos no adelantan el reintento: solo se acumulan
+                    time.sleep(self._backoff)
+                    wait = 0.0
+                else:
+                    wait = self.FALLBACK_INTERVAL_SECONDS
+        finally:
+            self.close()
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+        self.use_case.close()
@@ -1,6 +1,7 @@
-import time
+import json
 import logging
 from src.SyncDocumentsUseCase import SyncDocumentsUseCase
+from src.SyncScheduler import SyncScheduler
 
 # Configurar logging
 logging.basicConfig(
@@ -8,12 +9,20 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+CONFIG_PATH = "/var/lib/vhs/config.json"
+DEFAULT_DETECTIONS_DIR = "/opt/vhs/storage/detections"
+
+def get_detections_dir() -> str:
+    """Directorio de detecciones compartido con camera.service (config.json: base_storage_dir)."""
+    try:
+        with open(CONFIG_PATH, "r", encoding="utf-8") as f:
+            return json.load(f).get("base_storage_dir", DEFAULT_DETECTIONS_DIR)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        logging.warning(f"No se pudo leer {CONFIG_PATH} ({e}). Usando {DEFAULT_DETECTIONS_DIR}")
+        return DEFAULT_DETECTIONS_DIR
+
 if __name__ == "__main__":
     
     logging.info("Iniciando servicio de sincronización de documentos")
-    sync_use_case = SyncDocumentsUseCase("/opt/vhs/storage/detections")
-    
-    while True:
-        sync_use_case.execute()
-        logging.info("Ciclo de sincronización completado, esperando 1 segundo antes de la próxima ejecución")
-        time.sleep(1000) 
\ No newline at end of file
+    sync_use_case = SyncDocumentsUseCase(get_detections_dir())
+    SyncScheduler(sync_use_case).run() 
\ No newline at end of file